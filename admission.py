@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Admission control for the HTTP server: bounded concurrency, per-client rate
+limits and priorities, so an overload is answered with fast 429/503 errors
+instead of an ever longer queue in which every request times out.
+
+Requests are classed by method and path:
+- health: /health and /metrics; never limited;
+- write: task completions (single and bulk);
+- stream: the /api/admin/events feed; rate limited, but not counted as
+  running (a stream is open for many seconds while doing almost nothing);
+- read: everything else.
+
+At most max_concurrency requests run at once, writes at most max_writes of
+them, so reads always have slots left. Requests beyond that wait in a queue
+of at most max_queue for up to queue_timeout_ms; freed slots go to waiting
+reads before writes. A full queue or an expired wait is answered with 503
+and Retry-After.
+
+With rate_limit set, each client (by IP address; by the first
+X-Forwarded-For entry with trust_forwarded_for, behind a proxy) has a token
+bucket of rate_burst requests refilled at rate_limit per second; an empty
+bucket is answered with 429 and Retry-After.
+
+Settings come from the "admission" section of config.json, overridden by
+HTTP_MAX_CONCURRENCY, HTTP_MAX_WRITES, HTTP_MAX_QUEUE,
+HTTP_QUEUE_TIMEOUT_MS, HTTP_RATE_LIMIT, HTTP_RATE_BURST and
+HTTP_TRUST_FORWARDED_FOR.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+import metrics
+
+HEALTH, READ, WRITE, STREAM = "health", "read", "write", "stream"
+HEALTH_PATHS = frozenset({"/health", "/metrics"})
+WRITE_PATHS = frozenset({"/api/users/tasks/complete", "/api/users/tasks/complete/bulk"})
+STREAM_PATHS = frozenset({"/api/admin/events"})
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_QUEUE = 256
+DEFAULT_QUEUE_TIMEOUT_MS = 1000
+MAX_TRACKED_CLIENTS = 10000
+
+
+def request_kind(method: str, path: str) -> str:
+    if path in HEALTH_PATHS:
+        return HEALTH
+    if path in STREAM_PATHS:
+        return STREAM
+    if method == "POST" and path in WRITE_PATHS:
+        return WRITE
+    return READ
+
+
+class ConcurrencyLimiter:
+    """
+    Slots for running requests, with a bounded queue in which reads are
+    served before writes. Runs on one event loop.
+    """
+
+    def __init__(self, limit: int, write_limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.write_limit = write_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.running_writes = 0
+        self._waiters: Dict[str, deque] = {READ: deque(), WRITE: deque()}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters[READ]) + len(self._waiters[WRITE])
+
+    def _can_start(self, kind: str) -> bool:
+        return self.running < self.limit and (kind != WRITE or self.running_writes < self.write_limit)
+
+    def _start(self, kind: str) -> None:
+        self.running += 1
+        if kind == WRITE:
+            self.running_writes += 1
+
+    async def acquire(self, kind: str) -> bool:
+        """Takes a slot, waiting in the queue if needed; returns False if the request must be refused."""
+        # Don't overtake queued requests of the same or a higher priority
+        ahead = len(self._waiters[READ]) if kind == READ else self.queued
+        if not ahead and self._can_start(kind):
+            self._start(kind)
+            return True
+        if self.queued >= self.max_queue or self.queue_timeout <= 0:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters[kind]
+        waiters.append(future)
+        with metrics.HTTP_QUEUED.labels().track_inprogress():
+            try:
+                await asyncio.wait_for(future, self.queue_timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+            except asyncio.CancelledError:
+                # The slot may have been handed over just before the cancellation
+                if future.done() and not future.cancelled():
+                    self.release(kind)
+                raise
+            finally:
+                if future in waiters:
+                    waiters.remove(future)
+
+    def release(self, kind: str) -> None:
+        """Frees a slot and hands free slots to waiting reads, then writes."""
+        self.running -= 1
+        if kind == WRITE:
+            self.running_writes -= 1
+        for waiting_kind in (READ, WRITE):
+            waiters = self._waiters[waiting_kind]
+            while waiters and self._can_start(waiting_kind):
+                future = waiters.popleft()
+                if not future.done():
+                    self._start(waiting_kind)
+                    future.set_result(None)
+
+    def status(self) -> dict:
+        return {
+            "max_concurrency": self.limit,
+            "max_writes": self.write_limit,
+            "running": self.running,
+            "running_writes": self.running_writes,
+            "queued": self.queued,
+        }
+
+
+class RateLimiter:
+    """Token buckets per client; the least recently seen clients are forgotten beyond max_clients."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict = OrderedDict()  # client -> (tokens, updated at)
+
+    def take(self, client: str) -> float:
+        """Takes a token; returns 0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionControl:
+    """The limits of one HTTP server process; rate limiting is off without a rate."""
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_writes: Optional[int] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE, queue_timeout_ms: float = DEFAULT_QUEUE_TIMEOUT_MS,
+                 rate_limit: float = 0, rate_burst: Optional[float] = None, trust_forwarded_for: bool = False):
+        if max_writes is None:
+            max_writes = max(1, max_concurrency * 3 // 4)
+        self.limiter = ConcurrencyLimiter(
+            max_concurrency, min(max_writes, max_concurrency), max_queue, queue_timeout_ms / 1000
+        ) if max_concurrency > 0 else None
+        self.rates = RateLimiter(rate_limit, rate_burst or max(1.0, 2 * rate_limit)) if rate_limit > 0 else None
+        self.trust_forwarded_for = trust_forwarded_for
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdmissionControl":
+        """Reads the "admission" section of config.json, with environment overrides."""
+        settings = config.get("admission", {})
+
+        def setting(name: str, env: str, default, convert=float):
+            value = os.environ.get(env, settings.get(name))
+            return default if value is None or value == "" else convert(value)
+
+        return cls(
+            max_concurrency=setting("max_concurrency", "HTTP_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY, int),
+            max_writes=setting("max_writes", "HTTP_MAX_WRITES", None, int),
+            max_queue=setting("max_queue", "HTTP_MAX_QUEUE", DEFAULT_MAX_QUEUE, int),
+            queue_timeout_ms=setting("queue_timeout_ms", "HTTP_QUEUE_TIMEOUT_MS", DEFAULT_QUEUE_TIMEOUT_MS),
+            rate_limit=setting("rate_limit", "HTTP_RATE_LIMIT", 0),
+            rate_burst=setting("rate_burst", "HTTP_RATE_BURST", None),
+            trust_forwarded_for=setting(
+                "trust_forwarded_for", "HTTP_TRUST_FORWARDED_FOR", False,
+                lambda value: str(value).lower() in ("1", "true", "yes")
+            ),
+        )
+
+    def client_of(self, scope) -> str:
+        if self.trust_forwarded_for:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def status(self) -> dict:
+        return {
+            "concurrency": self.limiter.status() if self.limiter is not None else None,
+            "rate_limit": {"rate": self.rates.rate, "burst": self.rates.burst} if self.rates is not None else None,
+        }
+
+
+async def _reject(send, status: int, retry_after: float, detail: str) -> None:
+    body = f'{{"detail":"{detail}"}}'.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionControl to HTTP requests."""
+
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        kind = request_kind(scope["method"], scope["path"])
+        if kind == HEALTH:
+            await self.app(scope, receive, send)
+            return
+
+        control = self.control
+        if control.rates is not None:
+            wait = control.rates.take(control.client_of(scope))
+            if wait:
+                metrics.HTTP_REJECTED.labels(kind, "rate_limited").inc()
+                await _reject(send, 429, wait, "Too many requests, retry later")
+                return
+
+        limiter = control.limiter
+        if limiter is None or kind == STREAM:
+            await self.app(scope, receive, send)
+            return
+        if not await limiter.acquire(kind):
+            metrics.HTTP_REJECTED.labels(kind, "overloaded").inc()
+            await _reject(send, 503, limiter.queue_timeout, "Server overloaded, retry later")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(kind)
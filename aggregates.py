@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained cohort counters for mentor dashboards.
+
+A storage backend with an attached CohortIndex reports every user change to
+it as (email, record before, record after); the index moves the user between
+the counters of their checklist, so answering "how many people are stuck on
+day 2" costs O(days + tasks) no matter how many users exist.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from checklist import ChecklistLayout, ChecklistSet
+from store import UserRecord, popcount
+
+
+def creation_week(created_at: str) -> str:
+    """Returns the ISO week ("2025-W47") of a created_at timestamp."""
+    try:
+        year, week, _ = datetime.fromisoformat(created_at).isocalendar()
+    except (TypeError, ValueError):
+        return "unknown"
+    return f"{year}-W{week:02d}"
+
+
+class ChecklistCounters:
+    """
+    Counters over the users of one checklist:
+    - tasks: users who completed each task;
+    - days_completed: users who completed every task of a day;
+    - current_day: users whose first day with open tasks is this day
+      (None = all tasks completed), i.e. where people are stuck;
+    - progress: users by number of completed tasks;
+    - weeks: users by ISO week of creation.
+    """
+
+    def __init__(self, layout: ChecklistLayout):
+        self.layout = layout
+        self.users = 0
+        self.tasks: Counter = Counter()
+        self.days_completed: Counter = Counter()
+        self.current_day: Counter = Counter()
+        self.progress: Counter = Counter()
+        self.weeks: Counter = Counter()
+
+    def count(self, user: UserRecord, delta: int) -> None:
+        """Adds (delta=1) or removes (delta=-1) one user's contribution."""
+        layout = self.layout
+        mask = user.mask & layout.mask
+        current_day = None
+        for day in layout.days:
+            if mask & layout.day_masks[day] == layout.day_masks[day]:
+                self.days_completed[day] += delta
+            elif current_day is None:
+                current_day = day
+
+        self.users += delta
+        for task_id in layout.tasks:
+            if mask >> task_id & 1:
+                self.tasks[task_id] += delta
+        self.current_day[current_day] += delta
+        self.progress[popcount(mask)] += delta
+        self.weeks[creation_week(user.created_at)] += delta
+
+    def summary(self) -> dict:
+        """Returns all counters in a JSON-friendly form."""
+        layout = self.layout
+        return {
+            "checklist": layout.name,
+            "checklist_version": layout.version,
+            "total_users": self.users,
+            "finished": self.current_day[None],
+            "tasks": [
+                {"id": task_id, "day": info["day"], "task": info["task"], "completed": self.tasks[task_id]}
+                for task_id, info in layout.tasks.items()
+            ],
+            "days": {
+                f"day_{day}": {"completed": self.days_completed[day], "stuck": self.current_day[day]}
+                for day in layout.days
+            },
+            "progress": {
+                str(count): self.progress[count] for count in range(layout.total_tasks + 1)
+            },
+            "created_by_week": {week: count for week, count in sorted(self.weeks.items()) if count},
+        }
+
+
+def merge_summaries(summaries: List[dict]) -> dict:
+    """
+    Adds up ChecklistCounters.summary() results of one checklist over
+    disjoint sets of users (e.g. the shards of a ShardedStore).
+    """
+    merged = summaries[0]
+    weeks = Counter(merged["created_by_week"])
+    for summary in summaries[1:]:
+        merged["total_users"] += summary["total_users"]
+        merged["finished"] += summary["finished"]
+        for task, other in zip(merged["tasks"], summary["tasks"]):
+            task["completed"] += other["completed"]
+        for day, counts in summary["days"].items():
+            merged["days"][day]["completed"] += counts["completed"]
+            merged["days"][day]["stuck"] += counts["stuck"]
+        for count, users in summary["progress"].items():
+            merged["progress"][count] += users
+        weeks.update(summary["created_by_week"])
+    merged["created_by_week"] = {week: count for week, count in sorted(weeks.items()) if count}
+    return merged
+
+
+class CohortIndex:
+    """ChecklistCounters for every checklist, each user counted under the checklist assigned to them."""
+
+    def __init__(self, checklists: ChecklistSet):
+        self.checklists = checklists
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears all counters."""
+        self.counters = {name: ChecklistCounters(layout) for name, layout in self.checklists.layouts.items()}
+
+    def rebuild(self, users: Iterable[Tuple[str, UserRecord]]) -> None:
+        """Recomputes all counters from (email, record) pairs."""
+        self.reset()
+        for email, user in users:
+            self.counters[self.checklists.for_user(email).name].count(user, 1)
+
+    def on_change(self, email: str, before: Optional[UserRecord], after: UserRecord) -> None:
+        """Moves a user from their old counters (None = new user) to the new ones."""
+        counters = self.counters[self.checklists.for_user(email).name]
+        if before is not None:
+            counters.count(before, -1)
+        counters.count(after, 1)
+
+    def summary(self, checklist: Optional[str] = None) -> dict:
+        """Returns the counters of one checklist (the default one for None); raises KeyError if unknown."""
+        return self.counters[self.checklists.get(checklist).name].summary()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Bitmask user record benchmark over synthetic users.
+
+Builds --users users with random progress twice: as the old list-based
+dicts ({"completed_tasks": [...], ...}) and as bitmask UserRecords. Reports
+the memory each representation holds (tracemalloc) and the throughput of the
+per-user work the servers do: progress counts, per-day checks and the
+"open tasks on day N" report filter.
+
+Usage:
+    python benchmarks/bench_bitmask.py [--users 100000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from store import UserRecord, task_mask  # noqa: E402
+
+TASK_DAYS = {1: 1, 2: 1, 3: 1, 4: 2, 5: 2, 6: 2, 7: 3, 8: 3, 9: 3}
+DAYS = sorted(set(TASK_DAYS.values()))
+
+
+def synthetic_users(count: int, seed: int = 0) -> dict:
+    """Returns {email: completed task ids} with random progress."""
+    rng = random.Random(seed)
+    return {
+        f"user{i}@company.com": sorted(rng.sample(list(TASK_DAYS), rng.randint(0, len(TASK_DAYS))))
+        for i in range(count)
+    }
+
+
+def build_dicts(tasks: dict) -> dict:
+    return {
+        email: {"completed_tasks": list(task_ids), "created_at": "2025-11-23T10:00:00",
+                "last_updated": "2025-11-23T15:30:00"}
+        for email, task_ids in tasks.items()
+    }
+
+
+def build_records(tasks: dict) -> dict:
+    return {
+        email: UserRecord("2025-11-23T10:00:00", "2025-11-23T15:30:00", task_mask(task_ids))
+        for email, task_ids in tasks.items()
+    }
+
+
+def measure_memory(build, tasks: dict) -> int:
+    """Returns the bytes still allocated by build(tasks), excluding the email keys."""
+    gc.collect()
+    tracemalloc.start()
+    data = build(tasks)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def scan_dicts(data: dict) -> int:
+    """The old handlers: set() of completed_tasks, CHECKLIST filtered per day."""
+    matched = 0
+    for user in data.values():
+        completed = set(user["completed_tasks"])
+        progress = len(completed)
+        for day in DAYS:
+            day_tasks = [task_id for task_id, task_day in TASK_DAYS.items() if task_day == day]
+            done = [task_id for task_id in day_tasks if task_id in completed]
+            progress += len(done) == len(day_tasks)
+        if not {4, 5, 6}.issubset(user["completed_tasks"]):
+            matched += 1
+    return matched
+
+
+def scan_records(data: dict) -> int:
+    """The same work on UserRecords: popcount and mask ANDs."""
+    day_masks = [task_mask(t for t, d in TASK_DAYS.items() if d == day) for day in DAYS]
+    day_2 = day_masks[1]
+    matched = 0
+    for user in data.values():
+        mask = user.mask
+        progress = user.completed_count
+        for day_mask in day_masks:
+            progress += mask & day_mask == day_mask
+        if mask & day_2 != day_2:
+            matched += 1
+    return matched
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tasks = synthetic_users(args.users)
+    results = {"config": vars(args)}
+    for name, build, scan, serialize, parse in (
+        ("list_dict", build_dicts, scan_dicts, lambda user: user, lambda user: user),
+        ("bitmask_record", build_records, scan_records, UserRecord.to_dict, UserRecord.from_dict),
+    ):
+        data = build(tasks)
+        assert scan(data) == scan_dicts(build_dicts(tasks))
+        snapshot = json.dumps({email: serialize(user) for email, user in data.items()})
+        load_seconds = best_of(args.repeat, lambda: {e: parse(u) for e, u in json.loads(snapshot).items()})
+        scan_seconds = best_of(args.repeat, scan, data)
+        results[name] = {
+            "memory_bytes": measure_memory(build, tasks),
+            "snapshot_bytes": len(snapshot.encode("utf-8")),
+            "load_seconds": round(load_seconds, 4),
+            "scan_seconds": round(scan_seconds, 4),
+            "scan_users_per_second": round(args.users / scan_seconds),
+        }
+        del data
+
+    results["memory_ratio"] = round(
+        results["bitmask_record"]["memory_bytes"] / results["list_dict"]["memory_bytes"], 3)
+    results["scan_speedup"] = round(
+        results["list_dict"]["scan_seconds"] / results["bitmask_record"]["scan_seconds"], 2)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
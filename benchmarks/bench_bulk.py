@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Bulk API benchmark: one request per item vs batch endpoints.
+
+Drives the FastAPI app in-process against a JsonStore with fsync enabled and
+records --items completions (the HRIS sync case) in three ways:
+- "single_sequential": one POST /api/users/tasks/complete after another;
+- "single_concurrent": all single POSTs at once (group commit batches them);
+- "bulk": POST /api/users/tasks/complete/bulk with --batch items per request.
+Then reads every user's progress with single GETs vs POST /api/users/progress/bulk.
+Reports elapsed time, items per second and durable journal writes.
+
+Usage:
+    python benchmarks/bench_bulk.py [--items 2000] [--batch 500]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def run_completions(http, mode: str, pairs: list, batch: int) -> None:
+    if mode == "single_sequential":
+        for email, task_id in pairs:
+            await http.post("/api/users/tasks/complete", json={"email": email, "task_id": task_id})
+    elif mode == "single_concurrent":
+        await asyncio.gather(*(
+            http.post("/api/users/tasks/complete", json={"email": email, "task_id": task_id})
+            for email, task_id in pairs
+        ))
+    else:
+        for start in range(0, len(pairs), batch):
+            items = [{"email": email, "task_id": task_id} for email, task_id in pairs[start:start + batch]]
+            response = await http.post("/api/users/tasks/complete/bulk", json={"items": items})
+            assert response.json()["failed"] == 0
+
+
+async def run_lookups(http, mode: str, emails: list, batch: int) -> None:
+    if mode == "single":
+        for email in emails:
+            await http.get(f"/api/users/{email}/progress")
+    else:
+        for start in range(0, len(emails), batch):
+            await http.post("/api/users/progress/bulk", json={"emails": emails[start:start + batch]})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-bulk-")
+    os.chdir(tmpdir)
+    import httpx
+    import http_server
+    from store import AsyncStore, JsonStore
+
+    class CountingJsonStore(JsonStore):
+        """JsonStore that counts durable journal writes."""
+
+        writes = 0
+
+        def _append(self, records):
+            if records:
+                self.writes += 1
+            super()._append(records)
+
+    pairs = [(f"user{i // 9}@company.com", i % 9 + 1) for i in range(args.items)]
+    emails = sorted({email for email, _ in pairs})
+    results = {"config": vars(args), "completions": {}, "lookups": {}}
+
+    async def run(mode: str) -> None:
+        storage = CountingJsonStore(os.path.join(tmpdir, f"{mode}.json"))
+        storage.enable_group_commit(0)
+        http_server.core.store = AsyncStore(storage)
+        transport = httpx.ASGITransport(app=http_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            started = time.perf_counter()
+            await run_completions(http, mode, pairs, args.batch)
+            elapsed = time.perf_counter() - started
+            results["completions"][mode] = {
+                "seconds": round(elapsed, 3),
+                "items_per_second": round(len(pairs) / elapsed, 1),
+                "journal_writes": storage.writes,
+            }
+            assert sum(len(user.completed_tasks) for user in storage.load().values()) == len(pairs)
+
+            if mode == "bulk":
+                for lookup in ("single", "bulk"):
+                    started = time.perf_counter()
+                    await run_lookups(http, lookup, emails, args.batch)
+                    elapsed = time.perf_counter() - started
+                    results["lookups"][lookup] = {
+                        "seconds": round(elapsed, 3),
+                        "users_per_second": round(len(emails) / elapsed, 1),
+                    }
+        http_server.core.store.shutdown()
+
+    for mode in ("single_sequential", "single_concurrent", "bulk"):
+        asyncio.run(run(mode))
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
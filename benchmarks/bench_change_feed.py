@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Mentor dashboards: polling /api/admin/users vs the /api/admin/events feed.
+
+Starts `uvicorn http_server:app` over --users synthetic users
+(benchmarks/gen_data.py) and measures:
+- polling: latency and bytes of one full /api/admin/users report, i.e. the
+  cost every dashboard pays on every poll (full and compact);
+- feed: with --clients dashboards subscribed to /api/admin/events,
+  --writes task completions one after another; for each, the time until
+  every client has received its event, and the bytes per event. Feed
+  streams last 25 s, so keep --writes small enough to finish in that time.
+
+Usage:
+    python benchmarks/bench_change_feed.py [--users 10000] [--clients 20] [--writes 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+from bench_util import free_port, percentiles  # noqa: E402
+
+MENTOR = "mentor@company.com"
+
+
+async def measure_polling(http, rounds: int, compact: bool) -> dict:
+    latencies, size = [], 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        response = await http.post("/api/admin/users", json={"mentor_email": MENTOR, "compact": compact})
+        latencies.append(time.perf_counter() - started)
+        size = len(response.content)
+    return {**percentiles(latencies, (50, 95)), "bytes": size}
+
+
+async def subscribe(http, received: dict, ready: asyncio.Event, expected: int) -> None:
+    """Reads the feed, recording when each user's change arrived and its size."""
+    async with http.stream("GET", "/api/admin/events", params={"mentor_email": MENTOR}) as response:
+        ready.set()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "change":
+                email = json.loads(line[6:])["user"][0]
+                received.setdefault(email, []).append((time.perf_counter(), len(line) + 1))
+                if len(received) == expected:
+                    return
+
+
+async def measure_feed(http, clients: int, writes: int) -> dict:
+    rng = random.Random(1)
+    # A new user per write, so every write produces exactly one event
+    emails = [f"feed{n}@company.com" for n in range(writes)]
+    per_client = [dict() for _ in range(clients)]
+    readies = [asyncio.Event() for _ in range(clients)]
+    tasks = [asyncio.create_task(subscribe(http, received, ready, writes))
+             for received, ready in zip(per_client, readies)]
+    await asyncio.gather(*(ready.wait() for ready in readies))
+    await asyncio.sleep(0.2)
+
+    sent = {}
+    for email in emails:
+        sent[email] = time.perf_counter()
+        response = await http.post("/api/users/tasks/complete", json={"email": email, "task_id": rng.choice(gen_data.TASK_IDS)})
+        response.raise_for_status()
+    await asyncio.wait_for(asyncio.gather(*tasks), 60)
+
+    delivery = [max(received[email][0][0] for received in per_client) - sent[email] for email in emails]
+    event_bytes = [size for received in per_client for events in received.values() for _, size in events]
+    return {**percentiles(delivery, (50, 95)), "bytes_per_event": round(statistics.mean(event_bytes))}
+
+
+async def run(url: str, args) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.clients + 4)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        return {
+            "poll_full": await measure_polling(http, args.polls, compact=False),
+            "poll_compact": await measure_polling(http, args.polls, compact=True),
+            "feed": await measure_feed(http, args.clients, args.writes),
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=20, help="subscribed dashboards")
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=5, help="full reports to time")
+    args = parser.parse_args()
+
+    import httpx
+
+    workdir = tempfile.mkdtemp(prefix="bench-feed-")
+    gen_data.write_data_file(os.path.join(workdir, "data.json"), args.users)
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"mentors": [MENTOR]}, f)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "http_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                httpx.get(f"{url}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        results = {"config": vars(args), **asyncio.run(run(url, args))}
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: storage I/O on the event loop vs in the storage thread pool.
+
+Drives the FastAPI app in-process with an open-loop workload (requests
+arrive at a fixed rate whether or not earlier ones finished; mostly reads,
+some task completions). Latency is measured from each request's scheduled
+arrival time, so time spent waiting behind a blocked event loop counts.
+Reports p50/p95/p99 latency per request type for:
+- "inline": storage calls run directly on the event loop (the old behaviour);
+- "threadpool": storage calls go through AsyncStore's bounded thread pool.
+
+--write-delay-ms simulates a slow disk by sleeping inside every write.
+
+Usage:
+    python benchmarks/bench_event_loop.py [--users 1000] [--rate 300] [--requests 3000] [--write-delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_util import percentiles  # noqa: E402
+
+
+class SlowDisk:
+    """Storage proxy that sleeps inside every write to simulate a slow disk."""
+
+    def __init__(self, storage, delay: float):
+        self.storage = storage
+        self.delay = delay
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    def create_user(self, email):
+        time.sleep(self.delay)
+        return self.storage.create_user(email)
+
+    def complete_task(self, email, task_id):
+        time.sleep(self.delay)
+        return self.storage.complete_task(email, task_id)
+
+
+async def run_mode(http_server, store, args) -> dict:
+    """Runs the mixed workload against the app with the given store."""
+    import httpx
+
+    http_server.core.store = store
+    emails = [f"user{i}@company.com" for i in range(args.users)]
+    latencies = {"read": [], "write": []}
+    rng = random.Random(0)
+
+    async def request(http, scheduled):
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        email = rng.choice(emails)
+        if rng.random() < args.write_ratio:
+            await http.post("/api/users/tasks/complete", json={"email": email, "task_id": rng.randint(1, 9)})
+            kind = "write"
+        else:
+            await http.get(f"/api/users/{email}/progress")
+            kind = "read"
+        latencies[kind].append(time.perf_counter() - scheduled)
+
+    transport = httpx.ASGITransport(app=http_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(request(http, started + i / args.rate) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "read": {"count": len(latencies["read"]), **percentiles(latencies["read"])},
+        "write": {"count": len(latencies["write"]), **percentiles(latencies["write"])},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=300.0, help="request arrivals per second")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--write-delay-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-event-loop-")
+    os.chdir(tmpdir)
+    import http_server
+    from store import AsyncStore, JsonStore
+
+    class InlineStore(AsyncStore):
+        """The old behaviour: storage calls block the event loop."""
+
+        async def run(self, fn, *args):
+            return fn(*args)
+
+    results = {"config": vars(args)}
+    for mode, store_class in (("inline", InlineStore), ("threadpool", AsyncStore)):
+        data_file = os.path.join(tmpdir, f"{mode}.json")
+        storage = JsonStore(data_file)
+        storage.save({
+            f"user{i}@company.com": {"completed_tasks": [], "created_at": "2025-01-01T00:00:00",
+                                     "last_updated": "2025-01-01T00:00:00"}
+            for i in range(args.users)
+        })
+        store = store_class(SlowDisk(storage, args.write_delay_ms / 1000))
+        results[mode] = asyncio.run(run_mode(http_server, store, args))
+        store.shutdown()
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Group commit benchmark: a burst of concurrent task completions.
+
+Fires --burst completions at once through AsyncStore against a JsonStore with
+fsync enabled, with group commit off and with several windows, and reports
+throughput, p50/p99 acknowledgement latency and the number of durable
+journal writes (fsyncs) per run.
+
+Usage:
+    python benchmarks/bench_group_commit.py [--burst 2000] [--windows off,0,2,5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_util import percentiles  # noqa: E402
+from store import AsyncStore, JsonStore  # noqa: E402
+
+
+class CountingJsonStore(JsonStore):
+    """JsonStore that counts durable journal writes."""
+
+    writes = 0
+
+    def _append(self, records):
+        if records:
+            self.writes += 1
+        super()._append(records)
+
+
+async def burst(store: AsyncStore, count: int) -> list:
+    """Completes `count` distinct (email, task) pairs concurrently."""
+    async def one(i):
+        started = time.perf_counter()
+        await store.complete_task(f"user{i // 9}@company.com", i % 9 + 1)
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(one(i) for i in range(count)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=2000)
+    parser.add_argument("--windows", default="off,0,2,5", help="comma-separated windows in ms, 'off' = disabled")
+    parser.add_argument("--io-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    results = {"config": vars(args), "runs": []}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for window in args.windows.split(","):
+            storage = CountingJsonStore(os.path.join(tmpdir, f"data-{window}.json"))
+            if window != "off":
+                storage.enable_group_commit(float(window))
+            store = AsyncStore(storage, max_workers=args.io_workers)
+
+            started = time.perf_counter()
+            latencies = asyncio.run(burst(store, args.burst))
+            elapsed = time.perf_counter() - started
+            store.shutdown()
+
+            results["runs"].append({
+                "group_commit_ms": window,
+                "throughput_ops": round(args.burst / elapsed, 1),
+                "journal_writes": storage.writes,
+                **percentiles(latencies, (50, 99)),
+            })
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
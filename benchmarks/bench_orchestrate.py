@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Orchestrate chat client: time to first text and connection reuse, offline.
+
+Starts benchmarks/mock_orchestrate.py (HTTPS with a self-signed certificate
+unless --plain-http) and sends --messages chat messages one after another,
+like a user chatting, with:
+- "fresh_post": a new requests.post per message waiting for the whole
+  answer (what streamlit_app.py used to do);
+- "pooled_post": OrchestrateClient's pooled session, whole answer;
+- "pooled_stream": OrchestrateClient(stream=True).stream_message, rendering
+  as it streams.
+
+Reports p50/p95 time until the user sees text, time to the whole answer and
+the number of connections the mock accepted, as JSON.
+
+Usage:
+    python benchmarks/bench_orchestrate.py [--messages 20] [--first-token-ms 300] [--token-ms 20] [--plain-http]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock_orchestrate  # noqa: E402
+from bench_util import percentiles  # noqa: E402
+from orchestrate_client import OrchestrateClient  # noqa: E402
+
+
+def fresh_post(url: str, verify, text: str):
+    """Yields the whole answer once, from a new connection (the old streamlit_app.py request)."""
+    import requests
+
+    response = requests.post(f"{url}/v1/messages", json={"input": {"text": text}}, timeout=30, verify=verify,
+                             headers={"Authorization": "Bearer mock"})
+    yield response.json()["output"]["text"]
+
+
+def run(server, messages: int, send) -> dict:
+    """Sends messages one by one; send(text) yields answer chunks."""
+    connections = server.connections
+    first_text, total = [], []
+    for n in range(messages):
+        started = time.perf_counter()
+        first = None
+        for _ in send(f"question {n}"):
+            if first is None:
+                first = time.perf_counter() - started
+        total.append(time.perf_counter() - started)
+        first_text.append(first)
+    return {
+        "time_to_first_text": percentiles(first_text, (50, 95), digits=1),
+        "time_to_full_answer": percentiles(total, (50, 95), digits=1),
+        "connections": server.connections - connections,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--plain-http", action="store_true", help="serve the mock over HTTP instead of HTTPS")
+    args = parser.parse_args()
+
+    server, url, verify = mock_orchestrate.start(
+        tls=not args.plain_http, first_token_ms=args.first_token_ms, token_ms=args.token_ms, tokens=args.tokens
+    )
+    client = OrchestrateClient(url, "mock", verify=verify)
+    streaming = OrchestrateClient(url, "mock", verify=verify, stream=True)
+    results = {
+        "config": {**vars(args), "url": url},
+        "fresh_post": run(server, args.messages, lambda text: fresh_post(url, verify, text)),
+        "pooled_post": run(server, args.messages, client.stream_message),
+        "pooled_stream": run(server, args.messages, streaming.stream_message),
+    }
+    client.close()
+    streaming.close()
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
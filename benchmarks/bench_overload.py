@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+HTTP server under overload, with and without admission control.
+
+Starts `uvicorn http_server:app` over --users synthetic users
+(benchmarks/gen_data.py) twice: with admission control off
+(HTTP_MAX_CONCURRENCY=0) and with --max-concurrency slots. Each time,
+--flood clients send task completions back to back for --seconds, far more
+than the server can absorb, while one probe client requests /health and
+one reads a user's progress every --probe-ms. Reports, as JSON:
+- health / read: p50 and p99 latency of the probes, and how many failed;
+- writes: responses by status code (503 = refused with Retry-After; 400 =
+  task already completed), and p50/p99 latency of the accepted ones.
+
+Usage:
+    python benchmarks/bench_overload.py [--users 20000] [--flood 200] [--seconds 10] [--max-concurrency 16]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+from bench_util import free_port, percentiles  # noqa: E402
+
+
+async def send(reader, writer, body: bytes) -> Tuple[int, bool]:
+    """Posts one task completion on a kept-alive connection; returns (status, has Retry-After)."""
+    writer.write(
+        b"POST /api/users/tasks/complete HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+    )
+    head = (await reader.readuntil(b"\r\n\r\n")).lower()
+    length = int(head.split(b"content-length:", 1)[1].split(b"\r\n", 1)[0])
+    await reader.readexactly(length)
+    return int(head.split(b" ", 2)[1]), b"retry-after:" in head
+
+
+async def flood(port: int, users: int, deadline: float, statuses: Counter, accepted: list, seed: int) -> None:
+    """
+    Sends task completions back to back until the deadline. Written against
+    raw sockets: an HTTP client library would spend more CPU than the server.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            body = json.dumps({"email": gen_data.email_of(rng.randrange(users)),
+                               "task_id": rng.choice(gen_data.TASK_IDS)}).encode("utf-8")
+            started = time.perf_counter()
+            status, retry_after = await send(reader, writer, body)
+            statuses[status] += 1
+            if status == 200:
+                accepted.append(time.perf_counter() - started)
+            elif status in (429, 503) and not retry_after:
+                statuses["missing_retry_after"] += 1
+    except (OSError, asyncio.IncompleteReadError):
+        statuses["error"] += 1
+    finally:
+        writer.close()
+
+
+async def probe(http, method: str, path: str, deadline: float, interval: float, **request) -> dict:
+    """Sends one request every interval until the deadline; returns its latencies and failures."""
+    import httpx
+
+    latencies, failed = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await http.request(method, path, **request)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        except httpx.TransportError:
+            failed += 1
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+    return {**percentiles(latencies, (50, 99), digits=1), "ok": len(latencies), "failed": failed}
+
+
+async def overload(port: int, args) -> dict:
+    import httpx
+
+    deadline = time.perf_counter() + args.seconds
+    statuses, accepted = Counter(), []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as probes:
+        interval = args.probe_ms / 1000
+        results = await asyncio.gather(
+            probe(probes, "GET", "/health", deadline, interval),
+            probe(probes, "GET", f"/api/users/{gen_data.email_of(0)}/progress", deadline, interval),
+            *(flood(port, args.users, deadline, statuses, accepted, seed) for seed in range(args.flood)),
+        )
+    return {
+        "health": results[0],
+        "read": results[1],
+        "writes": {
+            "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+            "accepted_per_second": round(len(accepted) / args.seconds, 1),
+            "accepted_latency": percentiles(accepted, (50, 99), digits=1),
+        },
+    }
+
+
+def run_server(workdir: str, env: dict, args) -> dict:
+    import httpx
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "http_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", "--backlog", "4096"],
+        cwd=workdir, env={**os.environ, "PYTHONPATH": ROOT, **env},
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                httpx.get(f"{url}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        return asyncio.run(overload(port, args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--flood", type=int, default=200, help="concurrent writing clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--probe-ms", type=float, default=100, help="interval between probe requests")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--queue-timeout-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-overload-")
+    data_file = os.path.join(workdir, "data.json")
+    results = {"config": vars(args)}
+    for name, env in (
+        ("admission_off", {"HTTP_MAX_CONCURRENCY": "0"}),
+        ("admission_on", {"HTTP_MAX_CONCURRENCY": str(args.max_concurrency),
+                          "HTTP_QUEUE_TIMEOUT_MS": str(args.queue_timeout_ms)}),
+    ):
+        # Same data for both runs
+        for stale in (data_file, data_file + ".journal"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        gen_data.write_data_file(data_file, args.users)
+        results[name] = run_server(workdir, env, args)
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Serialization cost of the mentor report and progress responses.
+
+Builds one /api/admin/users page of --page synthetic users
+(benchmarks/gen_data.py) and encodes it --rounds times per path:
+- "validated": what FastAPI does for a returned dict with a response_model
+  (AllUsersProgress validation, jsonable_encoder, JSONResponse);
+- "fast": FastJSONResponse with the stdlib encoder and, when installed,
+  with orjson (fastjson.py);
+- "compact": the compact report (rows as arrays) through FastJSONResponse.
+
+Also renders the progress of the same users in the full and compact
+variant. Reports microseconds per response and bytes per response as JSON.
+
+Usage:
+    python benchmarks/bench_serialization.py [--page 50] [--rounds 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+
+
+def measure(encode, rounds: int) -> dict:
+    """Returns microseconds per call and the size of the encoded body."""
+    body = encode()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        encode()
+    elapsed = time.perf_counter() - started
+    return {"us_per_response": round(elapsed / rounds * 1e6, 1), "bytes": len(body)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=50, help="users per report page")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    import fastjson
+    import reports
+    from checklist import ChecklistLayout, DEFAULT_CHECKLIST
+    from http_server import AllUsersProgress
+
+    layout = ChecklistLayout(DEFAULT_CHECKLIST)
+    page = list(gen_data.synthetic_records(args.page))
+    report = {
+        "users": {email: reports.user_summary(user, layout) for email, user in page},
+        "total_users": args.page,
+        "next_cursor": None,
+    }
+    compact = {
+        "fields": reports.COMPACT_FIELDS,
+        "users": [reports.user_row(email, user, layout) for email, user in page],
+        "total_users": args.page,
+        "next_cursor": None,
+    }
+
+    def validated():
+        model = AllUsersProgress.model_validate(report)
+        return JSONResponse(jsonable_encoder(model)).body
+
+    def stdlib():
+        return json.dumps(report, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    results = {
+        "config": vars(args),
+        "admin_users": {
+            "validated": measure(validated, args.rounds),
+            "fast_json": measure(stdlib, args.rounds),
+        },
+    }
+    if fastjson.orjson is not None:
+        results["admin_users"]["fast_orjson"] = measure(lambda: fastjson.FastJSONResponse(report).body, args.rounds)
+    results["admin_users"]["compact"] = measure(lambda: fastjson.FastJSONResponse(compact).body, args.rounds)
+
+    # Progress of the same users, rendered one by one; figures are per user
+    results["progress"] = {}
+    for variant, render in (("full", layout.render_json), ("compact", layout.render_compact_json)):
+        result = measure(lambda: b"".join(render(email, user) for email, user in page), args.rounds)
+        results["progress"][variant] = {
+            "us_per_response": round(result["us_per_response"] / args.page, 2),
+            "bytes": round(result["bytes"] / args.page),
+        }
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Load benchmark of the HTTP and MCP servers over synthetic user data.
+
+For every --users size, generates a data file (benchmarks/gen_data.py, same
+seed every run) and drives each --targets entry with the same closed-loop
+workload, --concurrency requests in flight:
+- "inprocess": the FastAPI app through httpx's ASGI transport (no sockets);
+- "uvicorn": `uvicorn http_server:app` in a subprocess, over HTTP;
+- "mcp": the MCP server's call_tool handler, called directly.
+
+The workload mixes (--mix, percentages):
+- read: a user's progress;
+- write: completing a task;
+- admin: a mentor report page (50 users) or the cohort summary, alternating.
+
+Each target starts from a fresh copy of the data. Reports the startup time
+(until the data is loaded), throughput and p50/p95/p99 latency per request
+kind as JSON. With --baseline (an earlier --output file), results are
+compared to it: a p95 more than --tolerance above the baseline, or
+throughput more than --tolerance below it, is listed under "regressions"
+and makes the exit code 1.
+
+Usage:
+    python benchmarks/bench_servers.py [--users 1000,100000] [--targets inprocess,uvicorn,mcp]
+        [--requests 2000] [--concurrency 16] [--mix read=80,write=15,admin=5]
+        [--backend json|sqlite] [--output results.json] [--baseline old.json] [--tolerance 0.25]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+from bench_util import free_port, percentiles  # noqa: E402
+
+MENTOR = "mentor@company.com"
+KINDS = ("read", "write", "admin")
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}; expected {', '.join(KINDS)}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def make_plan(users: int, requests: int, mix: dict, seed: int) -> list:
+    """Returns the (kind, email, task_id or admin report) requests of one run."""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=requests)
+    plan = []
+    for n, kind in enumerate(kinds):
+        email = gen_data.email_of(rng.randrange(users))
+        if kind == "write":
+            plan.append((kind, email, rng.choice(gen_data.TASK_IDS)))
+        elif kind == "admin":
+            plan.append((kind, MENTOR, "users" if n % 2 else "summary"))
+        else:
+            plan.append((kind, email, None))
+    return plan
+
+
+async def drive(plan: list, concurrency: int, call) -> dict:
+    """Runs the plan with `concurrency` workers; call(op) returns False on an error response."""
+    latencies = {kind: [] for kind in KINDS}
+    errors = 0
+    ops = iter(plan)
+
+    async def worker():
+        nonlocal errors
+        for op in ops:
+            started = time.perf_counter()
+            ok = await call(op)
+            latencies[op[0]].append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = {
+        "requests": len(plan),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(plan) / elapsed, 1),
+    }
+    result.update((kind, {"count": len(samples), **percentiles(samples)}) for kind, samples in latencies.items() if samples)
+    return result
+
+
+def http_call(http):
+    async def call(op):
+        kind, email, arg = op
+        if kind == "read":
+            response = await http.get(f"/api/users/{email}/progress")
+        elif kind == "write":
+            response = await http.post("/api/users/tasks/complete", json={"email": email, "task_id": arg})
+        elif arg == "users":
+            response = await http.post("/api/admin/users", json={"mentor_email": email, "limit": 50})
+        else:
+            response = await http.post("/api/admin/summary", json={"mentor_email": email})
+        return response.status_code < 400
+    return call
+
+
+def mcp_call(server):
+    async def call(op):
+        kind, email, arg = op
+        if kind == "read":
+            result = await server.call_tool("get_user_progress", {"email": email})
+        elif kind == "write":
+            result = await server.call_tool("mark_task_complete", {"email": email, "task_id": arg})
+        elif arg == "users":
+            result = await server.call_tool("get_all_users_progress", {"mentor_email": email, "limit": 50})
+        else:
+            result = await server.call_tool("get_cohort_summary", {"mentor_email": email})
+        return not result[0].text.startswith("Error")
+    return call
+
+
+def prepare_run_dir(source: str, backend: str) -> str:
+    """Copies the generated data into a fresh directory with a config.json; returns it."""
+    run_dir = tempfile.mkdtemp(prefix="bench-run-")
+    data_name = os.path.basename(source)
+    shutil.copy(source, os.path.join(run_dir, data_name))
+    with open(os.path.join(run_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"mentors": [MENTOR], "storage": {"backend": backend, "path": data_name}}, f)
+    return run_dir
+
+
+async def run_inprocess(plan: list, concurrency: int) -> dict:
+    import httpx
+    import http_server
+    from core import OnboardingCore
+
+    started = time.perf_counter()
+    http_server.core = OnboardingCore()
+    startup = time.perf_counter() - started
+    try:
+        transport = httpx.ASGITransport(app=http_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            result = await drive(plan, concurrency, http_call(http))
+    finally:
+        http_server.core.close()
+    return {"startup_seconds": round(startup, 3), **result}
+
+
+async def run_mcp(plan: list, concurrency: int) -> dict:
+    import server
+    from core import OnboardingCore
+
+    started = time.perf_counter()
+    server.core = OnboardingCore()
+    startup = time.perf_counter() - started
+    try:
+        result = await drive(plan, concurrency, mcp_call(server))
+    finally:
+        server.core.close()
+    return {"startup_seconds": round(startup, 3), **result}
+
+
+async def run_uvicorn(plan: list, concurrency: int, run_dir: str) -> dict:
+    import httpx
+
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "http_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=run_dir, env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as http:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+                try:
+                    await http.get("/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.05)
+            startup = time.perf_counter() - started
+            result = await drive(plan, concurrency, http_call(http))
+    finally:
+        process.terminate()
+        process.wait()
+    return {"startup_seconds": round(startup, 3), **result}
+
+
+def find_regressions(results: list, baseline: list, tolerance: float) -> list:
+    """Lists runs whose p95 rose or throughput fell by more than tolerance vs the baseline."""
+    previous = {(run["users"], run["target"], run["backend"]): run for run in baseline}
+    regressions = []
+    for run in results:
+        before = previous.get((run["users"], run["target"], run["backend"]))
+        if before is None:
+            continue
+        where = f"{run['target']} ({run['backend']}, {run['users']} users)"
+        if run["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{where}: throughput {before['throughput_rps']} -> {run['throughput_rps']} rps")
+        for kind in KINDS:
+            if kind in run and kind in before and run[kind]["p95_ms"] > before[kind]["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{where}: {kind} p95 {before[kind]['p95_ms']} -> {run[kind]['p95_ms']} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1000,100000", help="comma-separated data sizes")
+    parser.add_argument("--targets", default="inprocess,uvicorn,mcp")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("read=80,write=15,admin=5"))
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.users.split(",")]
+    targets = args.targets.split(",")
+    runners = {"inprocess", "uvicorn", "mcp"}
+    if not set(targets) <= runners:
+        parser.error(f"unknown target in {args.targets}; expected {', '.join(sorted(runners))}")
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = tempfile.mkdtemp(prefix="bench-servers-")
+    # The servers read config.json and checklists from the working directory.
+    # Import them from the still empty workdir, so the core they create at
+    # import time loads nothing; each run replaces it with its own.
+    os.chdir(workdir)
+    if "inprocess" in targets:
+        import http_server  # noqa: F401
+    if "mcp" in targets:
+        import server  # noqa: F401
+    results = []
+    for size in sizes:
+        source = os.path.join(workdir, f"users-{size}.{'db' if args.backend == 'sqlite' else 'json'}")
+        started = time.perf_counter()
+        write = gen_data.write_database if args.backend == "sqlite" else gen_data.write_data_file
+        data_bytes = write(source, size, args.seed)
+        generate_seconds = time.perf_counter() - started
+        plan = make_plan(size, args.requests, args.mix, args.seed)
+
+        for target in targets:
+            run_dir = prepare_run_dir(source, args.backend)
+            os.chdir(run_dir)
+            if target == "inprocess":
+                result = asyncio.run(run_inprocess(plan, args.concurrency))
+            elif target == "mcp":
+                result = asyncio.run(run_mcp(plan, args.concurrency))
+            else:
+                result = asyncio.run(run_uvicorn(plan, args.concurrency, run_dir))
+            os.chdir(workdir)
+            shutil.rmtree(run_dir, ignore_errors=True)
+            results.append({
+                "target": target, "backend": args.backend, "users": size, "data_bytes": data_bytes,
+                "generate_seconds": round(generate_seconds, 3), **result,
+            })
+        os.remove(source)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    report = {"config": config, "results": results}
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            report["regressions"] = find_regressions(results, json.load(f)["results"], args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Throughput of the storage layer by number of shards, on one machine.
+
+For every --shards count, writes --users synthetic users (gen_data.py) to a
+sharded layout, then:
+- writes: --processes processes (like uvicorn workers or server instances
+  sharing the files), each with --threads threads, complete random tasks
+  through open_store() for --seconds, with the servers' defaults (fsync,
+  group commit, compaction every 1000 journal records per shard). Reports
+  completions per second, the speed-up over the first shard count and
+  p50/p99 latency per completion;
+- reads: p50/p99 of single-user reads, and the time of a full mentor report
+  (all users, email order, merged across shards) and of the cohort summary.
+
+Scaling comes from per-shard locks (writes to different shards don't wait
+for each other) and from compaction: each shard rewrites only its own
+snapshot, a N-th of the users. Results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_sharding.py [--shards 1,2,4,8] [--users 100000] [--processes 4] [--seconds 5]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+import reports  # noqa: E402
+from bench_util import percentiles  # noqa: E402
+from aggregates import CohortIndex  # noqa: E402
+from checklist import open_registry  # noqa: E402
+from store import open_store  # noqa: E402
+
+
+def writer_process(config: dict, users: int, threads: int, seconds: float, seed: int, results) -> None:
+    """Completes random tasks from several threads until the deadline; reports the latencies."""
+    storage = open_store(config)
+    storage.count_users()  # load before the clock starts
+    latencies = []
+    start = threading.Barrier(threads)
+
+    def run(thread_seed: int) -> None:
+        rng = random.Random(thread_seed)
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            email = gen_data.email_of(rng.randrange(users))
+            started = time.perf_counter()
+            storage.complete_task(email, rng.choice(gen_data.TASK_IDS))
+            latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=run, args=(seed * 1000 + n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    storage.close()
+    results.put(latencies)
+
+
+def measure_writes(config: dict, args) -> dict:
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=writer_process,
+                                args=(config, args.users, args.threads, args.seconds, seed, results))
+        for seed in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    latencies = []
+    for _ in processes:
+        latencies.extend(results.get())
+    for process in processes:
+        process.join()
+    return {"completions_per_second": round(len(latencies) / args.seconds), **percentiles(latencies, (50, 99))}
+
+
+def measure_reads(config: dict, args) -> dict:
+    started = time.perf_counter()
+    storage = open_store(config)
+    storage.count_users()
+    load = time.perf_counter() - started
+    checklists = open_registry({}).current
+    storage.attach_index(CohortIndex(checklists))
+
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(2000):
+        email = gen_data.email_of(rng.randrange(args.users))
+        started = time.perf_counter()
+        storage.get_user(email)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    page, _ = reports.query_users(storage, checklists)
+    report = time.perf_counter() - started
+    assert len(page) == storage.count_users()
+    started = time.perf_counter()
+    storage.cohort_summary()
+    cohort = time.perf_counter() - started
+    storage.close()
+    return {
+        "load_ms": round(load * 1000, 1),
+        "get_user": percentiles(latencies, (50, 99)),
+        "full_report_ms": round(report * 1000, 1),
+        "cohort_summary_ms": round(cohort * 1000, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", default="1,2,4,8", help="comma-separated shard counts")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--processes", type=int, default=4, help="writer processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads per writer process")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for name in ("STORAGE_BACKEND", "STORAGE_PATH", "STORAGE_SHARDS"):
+        os.environ.pop(name, None)
+    results = {"config": vars(args), "cpu_count": os.cpu_count(), "runs": {}}
+    baseline = None
+    for shards in [int(count) for count in args.shards.split(",")]:
+        workdir = tempfile.mkdtemp(prefix=f"bench-shards-{shards}-")
+        path = os.path.join(workdir, "data.json")
+        if shards == 1:
+            gen_data.write_data_file(path, args.users)
+        else:
+            gen_data.write_shards(path, args.users, shards)
+        config = {"storage": {"path": path, "shards": shards}}
+
+        run = {"writes": measure_writes(config, args), "reads": measure_reads(config, args)}
+        throughput = run["writes"]["completions_per_second"]
+        baseline = baseline or throughput
+        run["writes"]["speedup"] = round(throughput / baseline, 2)
+        results["runs"][str(shards)] = run
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
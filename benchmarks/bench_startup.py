@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Cold start of the stdio MCP server, as agent platforms pay it per session.
+
+Spawns `python server.py` --runs times in a directory with --users
+synthetic users (benchmarks/gen_data.py) and speaks MCP to it over its
+stdin/stdout (newline-delimited JSON-RPC, no client library), timing from
+spawn to the response of:
+- initialize;
+- tools/list;
+- the first tools/call (get_user_progress of an existing user), also
+  timed on its own (first_call_latency), and a second one to show the
+  warm cost.
+
+--think-ms pauses between tools/list and the first tools/call, as a client
+does while its model picks a tool; the server loads the user data in the
+background meanwhile. The pause is not counted in first_call_tool.
+
+For reference it also times the floor that no server code can lower:
+spawning an interpreter that only imports the MCP SDK (`import
+mcp.server`) and exits. Reports p50/p95/max per step as JSON.
+
+The first tools/call must answer within --budget-ms (median over the
+runs); otherwise the script exits with code 1, so it can gate CI:
+
+    python benchmarks/bench_startup.py --users 10000 --budget-ms 1000
+
+Usage:
+    python benchmarks/bench_startup.py [--users 10000] [--runs 10] [--shards 1] [--think-ms 0] [--budget-ms 1000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+from bench_util import percentiles  # noqa: E402
+
+MENTOR = "mentor@company.com"
+PROTOCOL_VERSION = "2025-03-26"
+
+
+def summary(samples: list) -> dict:
+    return {**percentiles(samples, (50, 95), digits=1), "max_ms": round(max(samples) * 1000, 1)}
+
+
+class StdioSession:
+    """A spawned server and a minimal JSON-RPC client over its pipes."""
+
+    def __init__(self, command: list, cwd: str):
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(command, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self.next_id = 0
+
+    def send(self, method: str, params: dict, notification: bool = False) -> None:
+        message = {"jsonrpc": "2.0", "method": method, "params": params}
+        if not notification:
+            self.next_id += 1
+            message["id"] = self.next_id
+        self.process.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+
+    def request(self, method: str, params: dict) -> dict:
+        """Sends a request and waits for its response; raises RuntimeError on an error response."""
+        self.send(method, params)
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"server exited with code {self.process.wait()}")
+            message = json.loads(line)
+            if message.get("id") == self.next_id:
+                if "error" in message:
+                    raise RuntimeError(f"{method}: {message['error']}")
+                return message["result"]
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+
+
+def cold_start(workdir: str, email: str, think: float) -> dict:
+    """Times one session from spawn to each response."""
+    session = StdioSession([sys.executable, os.path.join(ROOT, "server.py")], workdir)
+    try:
+        timings = {}
+        session.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "1.0"},
+        })
+        timings["initialize"] = session.elapsed()
+        session.send("notifications/initialized", {}, notification=True)
+        tools = session.request("tools/list", {})
+        assert any(tool["name"] == "get_user_progress" for tool in tools["tools"])
+        timings["list_tools"] = session.elapsed()
+        time.sleep(think)
+        call = {"name": "get_user_progress", "arguments": {"email": email}}
+        started = time.perf_counter()
+        result = session.request("tools/call", call)
+        assert "Error" not in result["content"][0]["text"], result
+        timings["first_call_tool"] = session.elapsed() - think
+        timings["first_call_latency"] = time.perf_counter() - started
+        started = time.perf_counter()
+        session.request("tools/call", call)
+        timings["second_call_tool"] = time.perf_counter() - started
+        return timings
+    finally:
+        session.close()
+
+
+def sdk_import_floor() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import mcp.server, mcp.server.stdio"], check=True)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--think-ms", type=float, default=0,
+                        help="pause between tools/list and the first tools/call, like a client choosing a tool")
+    parser.add_argument("--budget-ms", type=float, default=1000,
+                        help="maximum median time from spawn to the first tools/call response")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    path = os.path.join(workdir, "data.json")
+    if args.shards > 1:
+        gen_data.write_shards(path, args.users, args.shards)
+    else:
+        gen_data.write_data_file(path, args.users)
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"mentors": [MENTOR], "storage": {"shards": args.shards}}, f)
+
+    for name in ("STORAGE_BACKEND", "STORAGE_PATH", "STORAGE_SHARDS", "CHECKLISTS_FILE"):
+        os.environ.pop(name, None)
+    email = gen_data.email_of(args.users // 2)
+    cold_start(workdir, email, args.think_ms / 1000)  # warm the OS file cache and bytecode caches
+    runs = [cold_start(workdir, email, args.think_ms / 1000) for _ in range(args.runs)]
+    floor = [sdk_import_floor() for _ in range(max(3, args.runs // 2))]
+
+    steps = {step: summary([run[step] for run in runs]) for step in runs[0]}
+    first_call = steps["first_call_tool"]["p50_ms"]
+    results = {
+        "config": vars(args),
+        "steps": steps,
+        "sdk_import_floor": summary(floor),
+        "budget": {"first_call_tool_p50_ms": first_call, "budget_ms": args.budget_ms,
+                   "ok": first_call <= args.budget_ms},
+    }
+    print(json.dumps(results, indent=2))
+    if not results["budget"]["ok"]:
+        print(f"FAIL: first tools/call after {first_call} ms, budget {args.budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the benchmarks: a free local port for a server under test
+and latency percentiles in the JSON shape the benchmarks report.
+"""
+
+import socket
+import statistics
+from typing import Dict, Iterable, Optional
+
+
+def free_port() -> int:
+    """Returns a TCP port on 127.0.0.1 that is free right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(samples: list, points: Iterable[int] = (50, 95, 99), digits: int = 2) -> Dict[str, Optional[float]]:
+    """
+    Returns the given percentiles of latency samples (seconds) in milliseconds,
+    e.g. {"p50_ms": 1.2, "p95_ms": 3.4}. A single sample is every percentile;
+    without samples they are None.
+    """
+    if not samples:
+        return {f"p{point}_ms": None for point in points}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else [samples[0]] * 99
+    return {f"p{point}_ms": round(cuts[point - 1] * 1000, digits) for point in points}
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Read scaling of the multi-worker HTTP server.
+
+For every --workers count, starts `python http_server.py --workers N` over
+the same synthetic data (benchmarks/gen_data.py), waits until every worker
+answers /health, and loads it for --seconds with --clients client processes,
+each keeping --concurrency progress reads in flight. Reports requests per
+second, the speed-up over the first worker count and the per-worker
+efficiency (speed-up / workers ratio), together with os.cpu_count():
+scaling stops at the number of cores, and the client processes need cores
+too.
+
+Then checks coherence: --writes task completions, each read back right away
+on a new connection (so by any worker), counting reads that miss the write,
+and stops the server with SIGTERM. After the graceful shutdown every
+acknowledged write must be in the data files.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1,2,4] [--users 10000] [--seconds 5] [--clients 4]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gen_data  # noqa: E402
+from bench_util import free_port  # noqa: E402
+from store import JsonStore  # noqa: E402
+
+
+def client_process(url: str, users: int, seconds: float, concurrency: int, seed: int) -> int:
+    """Reads random users' progress for `seconds`; returns the number of successful requests."""
+    import httpx
+
+    async def run() -> int:
+        rng = random.Random(seed)
+        deadline = time.perf_counter() + seconds
+        done = 0
+
+        async def worker(http):
+            nonlocal done
+            while time.perf_counter() < deadline:
+                response = await http.get(f"/api/users/{gen_data.email_of(rng.randrange(users))}/progress")
+                done += response.status_code == 200
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as http:
+            await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+        return done
+
+    return asyncio.run(run())
+
+
+def wait_for_workers(url: str, workers: int, process: subprocess.Popen, timeout: float = 120) -> None:
+    """Waits until /health has been answered by `workers` distinct processes."""
+    import httpx
+
+    pids = set()
+    deadline = time.monotonic() + timeout
+    while len(pids) < workers:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"only {len(pids)} of {workers} workers answered")
+        try:
+            # A new connection each time, so the kernel spreads them over workers
+            pids.add(httpx.get(f"{url}/health", timeout=5).json()["worker_pid"])
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+
+def check_coherence(url: str, users: int, writes: int) -> dict:
+    """Completes tasks and reads each one back on a new connection; counts stale reads."""
+    import httpx
+
+    rng = random.Random(1)
+    written, stale = [], 0
+    for _ in range(writes):
+        email, task_id = gen_data.email_of(rng.randrange(users)), rng.choice(gen_data.TASK_IDS)
+        response = httpx.post(f"{url}/api/users/tasks/complete", json={"email": email, "task_id": task_id})
+        response.raise_for_status()
+        written.append((email, task_id))
+        progress = httpx.get(f"{url}/api/users/{email}/progress").json()
+        stale += task_id not in progress["completed_tasks"]
+    return {"writes": writes, "stale_reads": stale, "written": written}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="client processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight per client process")
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-workers-")
+    data_file = os.path.join(workdir, "data.json")
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"mentors": []}, f)
+    results = {"config": vars(args), "cpu_count": os.cpu_count(), "runs": []}
+
+    for workers in [int(count) for count in args.workers.split(",")]:
+        gen_data.write_data_file(data_file, args.users)
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "http_server.py"), "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(workers)],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_workers(url, workers, process)
+            with multiprocessing.Pool(args.clients) as pool:
+                counts = pool.starmap(client_process, [
+                    (url, args.users, args.seconds, args.concurrency, seed) for seed in range(args.clients)
+                ])
+            coherence = check_coherence(url, args.users, args.writes)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+        # Every acknowledged write must have been flushed before exit
+        stored = JsonStore(data_file).load()
+        lost = sum(not stored[email].has(task_id) for email, task_id in coherence.pop("written"))
+        rps = sum(counts) / args.seconds
+        base = results["runs"][0] if results["runs"] else None
+        speedup = rps / base["reads_per_second"] if base else 1.0
+        results["runs"].append({
+            "workers": workers,
+            "reads_per_second": round(rps, 1),
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup * (base["workers"] if base else workers) / workers, 2),
+            **coherence,
+            "lost_writes": lost,
+        })
+        for suffix in ("", ".journal"):
+            if os.path.exists(data_file + suffix):
+                os.remove(data_file + suffix)
+
+    print(json.dumps(results, indent=2))
+    ok = all(run["stale_reads"] == 0 and run["lost_writes"] == 0 for run in results["runs"])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Local mock of the watsonx Orchestrate messages API.
+
+Answers POST .../v1/messages like the real service as far as
+streamlit_app.py is concerned: after --first-token-ms it streams --tokens
+words, one every --token-ms, as server-sent events (when the request has
+"stream": true and accepts text/event-stream), or sends the whole answer as
+one JSON body once all of them are "generated". Connections are kept alive
+(HTTP/1.1); GET /stats returns the number of connections and messages
+served. With --tls it serves HTTPS with a throwaway self-signed certificate
+(needs the openssl command), so handshake costs are like the real service's.
+
+Usage:
+    python benchmarks/mock_orchestrate.py [--port 8090] [--tls]
+    ORCHESTRATE_URL=http://127.0.0.1:8090 streamlit run streamlit_app.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+WORDS = (
+    "Welcome to the team! On your first day meet your manager and your buddy, read the company "
+    "handbook and complete the basic security training. Ask me anything about onboarding."
+).split()
+
+
+class MockOrchestrate(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], first_token_ms: float = 300, token_ms: float = 20,
+                 tokens: int = 40):
+        super().__init__(address, MessageHandler)
+        self.first_token = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.tokens = tokens
+        self.connections = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def answer(self, text: str):
+        """Yields the answer words, paced like a generating agent."""
+        time.sleep(self.first_token)
+        for n in range(self.tokens):
+            if n:
+                time.sleep(self.token_delay)
+            yield ("" if n == 0 else " ") + WORDS[n % len(WORDS)]
+
+
+class MessageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        # Send every event right away, like a streaming server does
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, value) -> None:
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.send_json(200, {"connections": self.server.connections, "messages": self.server.messages})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.endswith("/v1/messages"):
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(body)
+            text = request["input"]["text"]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"error": "expected {\"input\": {\"text\": ...}}"})
+            return
+        self.server.count("messages")
+
+        if not (request.get("stream") and "text/event-stream" in self.headers.get("Accept", "")):
+            self.send_json(200, {"output": {"text": "".join(self.server.answer(text))}})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in self.server.answer(text):
+            self.write_chunk(f"data: {json.dumps({'output': {'text': word}})}\n\n")
+        self.write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def self_signed_cert(directory: str) -> Tuple[str, str]:
+    """Creates a certificate for 127.0.0.1 / localhost with openssl; returns (certfile, keyfile)."""
+    certfile, keyfile = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", keyfile, "-out", certfile, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost"],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
+
+
+def start(port: int = 0, tls: bool = False, **options) -> Tuple[MockOrchestrate, str, object]:
+    """
+    Starts the mock in a background thread; returns (server, base URL,
+    certificate file to verify against, or True without TLS).
+    """
+    server = MockOrchestrate(("127.0.0.1", port), **options)
+    verify, scheme = True, "http"
+    if tls:
+        certfile, keyfile = self_signed_cert(tempfile.mkdtemp(prefix="mock-orchestrate-"))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        verify, scheme = certfile, "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}", verify
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS with a self-signed certificate")
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=40)
+    args = parser.parse_args()
+
+    server, url, verify = start(args.port, args.tls, first_token_ms=args.first_token_ms,
+                                token_ms=args.token_ms, tokens=args.tokens)
+    print(json.dumps({"url": url, "certificate": verify if args.tls else None}), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Bulk task completion and progress lookup, shared by the MCP and HTTP servers.
+
+A batch is validated against each user's checklist first; the valid items
+are then applied with one Storage.apply_mutations() call, i.e. one journal
+write (JSON) or one transaction (SQLite), and every item gets its own result.
+Invalid items are reported without failing the rest of the batch.
+"""
+
+from typing import List, Tuple
+
+import reports
+from checklist import ChecklistSet, is_task_id
+from store import AsyncStore, create_new_user
+
+MAX_BULK_ITEMS = 1000
+
+
+async def complete_tasks(store: AsyncStore, checklists: ChecklistSet, items: List[Tuple[str, int]]) -> List[dict]:
+    """Marks (email, task_id) pairs as completed; returns one result per pair, in order."""
+    results: List[dict] = [{"email": email, "task_id": task_id} for email, task_id in items]
+    mutations, positions = [], []
+    for position, (email, task_id) in enumerate(items):
+        layout = checklists.for_user(email)
+        if not is_task_id(task_id) or task_id not in layout.tasks:
+            results[position].update(success=False, error=f"Invalid task_id. Must be {layout.valid_ids}.")
+        else:
+            mutations.append(("complete", email, task_id))
+            positions.append(position)
+
+    applied = await store.apply_mutations(mutations) if mutations else []
+    for position, (user, was_completed) in zip(positions, applied):
+        layout = checklists.for_user(results[position]["email"])
+        results[position].update(
+            success=True,
+            was_already_completed=was_completed,
+            checklist=layout.name,
+            progress_percentage=layout.progress_percentage(user),
+        )
+    return results
+
+
+async def get_progress(store: AsyncStore, checklists: ChecklistSet, emails: List[str],
+                       create_missing: bool = False) -> dict:
+    """
+    Returns {email: mentor-report style summary} for every email. Unknown
+    emails get zero progress; they are saved only if create_missing is set.
+    """
+    emails = list(dict.fromkeys(emails))
+    users = await store.get_users(emails)
+    missing = [email for email in emails if email not in users]
+    if missing and create_missing:
+        created = await store.apply_mutations([("create", email, None) for email in missing])
+        users.update((email, user) for email, (user, _) in zip(missing, created))
+        missing = []
+    elif missing:
+        virtual = create_new_user()
+        users.update((email, virtual) for email in missing)
+        store.count_writes_avoided(len(missing))
+
+    unsaved = set(missing)
+    return {
+        email: {"exists": email not in unsaved, **reports.user_summary(users[email], checklists.for_user(email))}
+        for email in emails
+    }
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Change feed of user progress, served as server-sent events.
+
+The storage backend reports every user change it applies to the feed
+(on_change(email, before, after), like the cohort index) and calls reset()
+when changes can't be reported one by one, e.g. after re-reading a
+snapshot compacted by another process. Each change becomes one event with
+a sequence number, rendered once and kept in a bounded buffer: any number
+of clients are served the same bytes, and a client that reconnects resumes
+after the last event it saw (SSE Last-Event-ID) instead of reloading.
+
+Event ids are "<epoch>-<seq>". The epoch is random per process, so a client
+that reconnects to a restarted server or another worker, or that fell
+further behind than the buffer holds, gets a reset event instead of
+silently missing changes. A reset means: reload /api/admin/users, then keep
+applying events.
+
+Events (data is compact JSON):
+- ready: {"epoch", "seq", "fields"} first on every stream; "fields" names
+  the values of "user" rows (reports.COMPACT_FIELDS);
+- change: {"op": "create" | "complete", "task_ids": newly completed tasks,
+  "user": the user's row after the change};
+- reset: {"reason": "reload" | "restarted" | "too_old"}.
+"""
+
+import asyncio
+import secrets
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import reports
+from checklist import ChecklistRegistry, dumps
+from store import UserRecord, mask_tasks
+
+DEFAULT_FEED_EVENTS = 10000
+# Streams end after this long and clients reconnect (resuming where they
+# were), so a graceful shutdown never waits longer for open streams
+DEFAULT_STREAM_SECONDS = 25.0
+DEFAULT_POLL_SECONDS = 1.0
+KEEPALIVE_SECONDS = 10.0
+RECONNECT_MS = 1000
+
+
+class ChangeFeed:
+    """Numbered, pre-rendered change events in a bounded buffer, with wakeups for asyncio readers."""
+
+    def __init__(self, checklists: ChecklistRegistry, max_events: int = DEFAULT_FEED_EVENTS):
+        self.checklists = checklists
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self._events: "deque[Tuple[int, bytes]]" = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._notify_pending = False
+        self._polled_at = float("-inf")
+        self.subscribers = 0
+
+    # Writers (storage threads)
+
+    def on_change(self, email: str, before: Optional[UserRecord], after: UserRecord) -> None:
+        """Publishes a change event; after is the user's record once changed (None before = new user)."""
+        layout = self.checklists.current.for_user(email)
+        self._publish("change", {
+            "op": "create" if before is None else "complete",
+            "task_ids": mask_tasks(after.mask & ~(before.mask if before is not None else 0)),
+            "user": reports.user_row(email, after, layout),
+        })
+
+    def reset(self, reason: str = "reload") -> None:
+        """Publishes a reset event: clients must reload the full report."""
+        self._publish("reset", {"reason": reason})
+
+    def _publish(self, kind: str, data: dict) -> None:
+        with self._lock:
+            self.seq += 1
+            self._events.append((self.seq, self._render(self.seq, kind, data)))
+            loop = self._loop
+            if loop is None or self._notify_pending:
+                return
+            self._notify_pending = True
+        try:
+            loop.call_soon_threadsafe(self._notify)
+        except RuntimeError:  # the loop is closed
+            pass
+
+    def _render(self, seq: int, kind: str, data: dict) -> bytes:
+        return f"id: {self.epoch}-{seq}\nevent: {kind}\ndata: {dumps(data)}\n\n".encode("utf-8")
+
+    def _notify(self) -> None:
+        """Wakes every waiting reader (runs in the event loop)."""
+        with self._lock:
+            self._notify_pending = False
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    # Readers (event loop)
+
+    def _start(self, last_event_id: Optional[str]) -> Tuple[int, Optional[str]]:
+        """Returns the sequence number to continue after, and the reason to reset the client, if any."""
+        if not last_event_id:
+            return self.seq, None
+        epoch, _, seq = last_event_id.strip().rpartition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return self.seq, "restarted"
+        return int(seq), None
+
+    def _after(self, position: int) -> Tuple[List[bytes], bool]:
+        """Returns the events after a sequence number, and whether some were already dropped."""
+        with self._lock:
+            if position >= self.seq:
+                return [], False
+            first = self._events[0][0] if self._events else self.seq + 1
+            if position + 1 < first:
+                return [], True
+            return [body for _, body in islice(self._events, position + 1 - first, None)], False
+
+    async def stream(self, last_event_id: Optional[str] = None,
+                     poll: Optional[Callable[[], Awaitable[None]]] = None,
+                     stream_seconds: float = DEFAULT_STREAM_SECONDS,
+                     poll_seconds: float = DEFAULT_POLL_SECONDS) -> AsyncIterator[bytes]:
+        """
+        Yields the SSE stream of one client: ready, then events as they
+        come, for stream_seconds. poll() is awaited about every poll_seconds
+        (shared by all clients) to pick up changes by other processes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._wakeup = asyncio.Event()
+            self._loop = loop
+        position, reason = self._start(last_event_id)
+        yield f"retry: {RECONNECT_MS}\n".encode("ascii") + self._render(position, "ready", {
+            "epoch": self.epoch, "seq": position, "fields": reports.COMPACT_FIELDS
+        })
+        if reason is not None:
+            yield self._render(position, "reset", {"reason": reason})
+
+        self.subscribers += 1
+        try:
+            started = idle_since = time.monotonic()
+            while True:
+                events, dropped = self._after(position)
+                if dropped:
+                    position = self.seq
+                    yield self._render(position, "reset", {"reason": "too_old"})
+                    continue
+                if events:
+                    position += len(events)
+                    idle_since = time.monotonic()
+                    yield b"".join(events)
+                    continue
+
+                now = time.monotonic()
+                if now - started >= stream_seconds:
+                    return
+                if now - idle_since >= KEEPALIVE_SECONDS:
+                    idle_since = now
+                    yield b": keepalive\n\n"
+                    continue
+                if poll is not None and now - self._polled_at >= poll_seconds:
+                    self._polled_at = now
+                    await poll()
+                    continue
+                # No await since _after(), so no wakeup can be missed
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.subscribers -= 1
+
+    def status(self) -> dict:
+        return {"epoch": self.epoch, "seq": self.seq, "buffered": len(self._events), "subscribers": self.subscribers}
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Onboarding checklists: definitions, compiled layouts and rendered-progress cache.
+
+Checklists are defined in checklists.json (path from config.json
+"checklists_file" or CHECKLISTS_FILE); without that file the built-in
+DEFAULT_CHECKLIST is used. Each checklist has a name, a version and tasks;
+users are assigned a checklist by email or by "@domain", everybody else gets
+the default one. ChecklistRegistry re-reads the file when it changes (checked
+at most once per recheck interval), so checklists and assignments can be
+edited without restarting the servers. refresh() does file I/O: the servers
+call it in the storage thread pool when refresh_due().
+
+ChecklistLayout compiles one checklist once into day-indexed lookup tables,
+together with the pieces of every response that do not depend on the user:
+a JSON fragment and a text line per task in both states, and the full
+/api/checklist body. Rendering a user's progress then only picks fragments
+by bit of the completion mask.
+
+RenderCache keeps recently rendered progress keyed on (checklist, email,
+completion mask, last_updated); a user whose record did not change is served
+from it, and its ETag lets clients revalidate with If-None-Match.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+from store import MAX_TASK_ID, UserRecord, file_signature, load_json_file, popcount, task_mask
+
+DEFAULT_CHECKLISTS_FILE = "checklists.json"
+DEFAULT_RENDER_CACHE_SIZE = 10000
+DEFAULT_RECHECK_SECONDS = 1.0
+
+# Used when there is no checklists file
+DEFAULT_CHECKLIST_NAME = "onboarding"
+DEFAULT_CHECKLIST = {
+    1: {"day": 1, "task": "Meet your manager"},
+    2: {"day": 1, "task": "Meet your buddy / mentor"},
+    3: {"day": 1, "task": "Read the company handbook"},
+    4: {"day": 1, "task": "Complete basic security training"},
+    5: {"day": 2, "task": "Set up your development environment"},
+    6: {"day": 2, "task": "Join the team stand-up meeting"},
+    7: {"day": 2, "task": "Read the documentation for the main product"},
+    8: {"day": 3, "task": "Shadow a team member during a real task"},
+    9: {"day": 3, "task": "Pick your first small task from the backlog"},
+}
+
+
+def is_task_id(value) -> bool:
+    """True for an int task id; bools and floats like 1.0 don't count."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def dumps(value) -> str:
+    """Serializes like FastAPI's JSONResponse (compact, UTF-8)."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class ChecklistLayout:
+    """A checklist compiled into lookup tables and pre-rendered fragments."""
+
+    def __init__(self, checklist: dict, name: str = DEFAULT_CHECKLIST_NAME, version: int = 1):
+        self.name = name
+        self.version = version
+        self.tasks = checklist
+        self.total_tasks = len(checklist)
+        self.mask = task_mask(checklist)
+        self.days = sorted({info["day"] for info in checklist.values()})
+        self.day_tasks: Dict[int, List[int]] = {
+            day: [task_id for task_id, info in checklist.items() if info["day"] == day] for day in self.days
+        }
+        self.day_masks = {day: task_mask(task_ids) for day, task_ids in self.day_tasks.items()}
+        # Changes whenever the checklist content changes, even without a version bump
+        self.fingerprint = hashlib.sha1(
+            dumps([name, version, sorted(checklist.items())]).encode("utf-8")
+        ).hexdigest()[:12]
+
+        # Per task: (open, completed) fragments
+        self._task_json = {
+            task_id: tuple(
+                dumps({"id": task_id, "task": info["task"], "completed": done}) for done in (False, True)
+            )
+            for task_id, info in checklist.items()
+        }
+        self._task_lines = {
+            task_id: tuple(f"  {mark} {task_id}. {info['task']}" for mark in ("☐", "✓"))
+            for task_id, info in checklist.items()
+        }
+
+        self.checklist_body = dumps({
+            "name": name,
+            "version": version,
+            "checklist": {
+                day: [{"id": task_id, "task": checklist[task_id]["task"]} for task_id in task_ids]
+                for day, task_ids in self.day_tasks.items()
+            },
+            "total_tasks": self.total_tasks,
+            "total_days": len(self.days)
+        }).encode("utf-8")
+        self.checklist_etag = f'"checklist-{self.fingerprint}"'
+
+        task_ids = sorted(checklist)
+        if task_ids == list(range(task_ids[0], task_ids[-1] + 1)):
+            self.valid_ids = f"between {task_ids[0]} and {task_ids[-1]}"
+        else:
+            self.valid_ids = "one of " + ", ".join(str(task_id) for task_id in task_ids)
+
+    def completed_count(self, user: UserRecord) -> int:
+        """Returns how many tasks of this checklist the user completed."""
+        return popcount(user.mask & self.mask)
+
+    def progress_percentage(self, user: UserRecord) -> float:
+        return round(self.completed_count(user) / self.total_tasks * 100, 1) if self.total_tasks > 0 else 0
+
+    def render_json(self, email: str, user: UserRecord) -> bytes:
+        """Renders the GET /api/users/{email}/progress body."""
+        mask = user.mask
+        days = ",".join(
+            f'"day_{day}":[' + ",".join(self._task_json[task_id][mask >> task_id & 1] for task_id in task_ids) + "]"
+            for day, task_ids in self.day_tasks.items()
+        )
+        return (
+            f'{{"email":{dumps(email)},"checklist":{dumps(self.name)},"checklist_version":{self.version},'
+            f'"completed_tasks":{dumps(user.completed_tasks)},'
+            f'"created_at":{dumps(user.created_at)},"last_updated":{dumps(user.last_updated)},'
+            f'"progress_percentage":{self.progress_percentage(user)},"total_tasks":{self.total_tasks},'
+            f'"tasks_by_day":{{{days}}}}}'
+        ).encode("utf-8")
+
+    def render_compact_json(self, email: str, user: UserRecord) -> bytes:
+        """Renders the progress body without tasks_by_day (task texts come from /api/checklist)."""
+        return (
+            f'{{"email":{dumps(email)},"checklist":{dumps(self.name)},"checklist_version":{self.version},'
+            f'"completed_tasks":{dumps(user.completed_tasks)},'
+            f'"created_at":{dumps(user.created_at)},"last_updated":{dumps(user.last_updated)},'
+            f'"progress_percentage":{self.progress_percentage(user)},"total_tasks":{self.total_tasks}}}'
+        ).encode("utf-8")
+
+    def render_text(self, email: str, user: UserRecord) -> str:
+        """Renders progress in readable format for the MCP tools."""
+        mask = user.mask
+        result = [f"Onboarding Progress for: {email}"]
+        result.append(f"Checklist: {self.name} (version {self.version})")
+        result.append(f"Started: {user.created_at}")
+        result.append(f"Last Updated: {user.last_updated}")
+        result.append("")
+        for day, task_ids in self.day_tasks.items():
+            result.append(f"Day {day}:")
+            result.extend(self._task_lines[task_id][mask >> task_id & 1] for task_id in task_ids)
+            result.append("")
+        result.append(f"Progress: {self.completed_count(user)}/{self.total_tasks} tasks completed")
+        return "\n".join(result)
+
+    def etag(self, email: str, user: UserRecord, variant: str = "") -> str:
+        """Returns the ETag of a user's rendered progress (per variant); equal in every process."""
+        key = f"{self.fingerprint}|{email}|{user.mask}|{user.last_updated}|{variant}".encode("utf-8")
+        return f'"{hashlib.blake2b(key, digest_size=12).hexdigest()}"'
+
+
+class ChecklistSet:
+    """Compiled checklists plus user assignments; never modified after creation."""
+
+    def __init__(self, layouts: Dict[str, ChecklistLayout], default: str, assignments: Optional[dict] = None):
+        self.layouts = layouts
+        self.default = layouts[default]
+        self.assignments = {key.lower(): layouts[name] for key, name in (assignments or {}).items()}
+
+    def for_user(self, email: str) -> ChecklistLayout:
+        """Returns the checklist assigned to an email, its domain ("@domain") or the default one."""
+        if not self.assignments:
+            return self.default
+        email = email.lower()
+        layout = self.assignments.get(email)
+        if layout is None:
+            layout = self.assignments.get(email[email.find("@"):], self.default)
+        return layout
+
+    def get(self, name: Optional[str] = None) -> ChecklistLayout:
+        """Returns a checklist by name (the default one for None); raises KeyError if unknown."""
+        return self.default if name is None else self.layouts[name]
+
+    @classmethod
+    def builtin(cls) -> "ChecklistSet":
+        return cls({DEFAULT_CHECKLIST_NAME: ChecklistLayout(DEFAULT_CHECKLIST)}, DEFAULT_CHECKLIST_NAME)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChecklistSet":
+        """Validates and compiles a checklists file; raises ValueError if it is invalid."""
+        checklists = data.get("checklists")
+        if not isinstance(checklists, dict) or not checklists:
+            raise ValueError("checklists must be a non-empty object of name -> checklist")
+        layouts = {}
+        for name, definition in checklists.items():
+            version = definition.get("version", 1)
+            if not isinstance(version, int):
+                raise ValueError(f"{name}: version must be an integer")
+            tasks = {}
+            for task in definition.get("tasks", []):
+                task_id, day, text = task.get("id"), task.get("day"), task.get("task")
+                if not is_task_id(task_id) or not 1 <= task_id <= MAX_TASK_ID:
+                    raise ValueError(f"{name}: task id must be an integer from 1 to {MAX_TASK_ID}, got {task_id!r}")
+                if task_id in tasks:
+                    raise ValueError(f"{name}: duplicate task id {task_id}")
+                if not isinstance(day, int) or day < 1:
+                    raise ValueError(f"{name}: task {task_id} needs a positive integer day")
+                if not isinstance(text, str) or not text:
+                    raise ValueError(f"{name}: task {task_id} needs a task description")
+                tasks[task_id] = {"day": day, "task": text}
+            if not tasks:
+                raise ValueError(f"{name}: checklist has no tasks")
+            layouts[name] = ChecklistLayout(tasks, name, version)
+
+        default = data.get("default", next(iter(layouts)))
+        if default not in layouts:
+            raise ValueError(f"default checklist {default!r} is not defined")
+        assignments = data.get("assignments", {})
+        for key, name in assignments.items():
+            if name not in layouts:
+                raise ValueError(f"assignment {key!r} refers to unknown checklist {name!r}")
+        return cls(layouts, default, assignments)
+
+
+class ChecklistRegistry:
+    """
+    The current ChecklistSet from a checklists file. refresh() re-reads the
+    file when it changed on disk; an invalid edit keeps the previous
+    checklists and is reported in last_error.
+    """
+
+    def __init__(self, path: str, recheck_seconds: float = DEFAULT_RECHECK_SECONDS):
+        self.path = path
+        self.recheck_seconds = recheck_seconds
+        self._signature = None
+        self._checked_at = time.monotonic()
+        self.last_error: Optional[str] = None
+        self.current = self._load()
+
+    def _load(self) -> ChecklistSet:
+        self._signature = file_signature(self.path)
+        if self._signature is None:
+            return ChecklistSet.builtin()
+        return ChecklistSet.from_dict(load_json_file(self.path))
+
+    def refresh_due(self) -> bool:
+        """Whether the recheck interval has passed, i.e. refresh() would look at the file."""
+        return time.monotonic() - self._checked_at >= self.recheck_seconds
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reloads the file if it changed; returns True if the checklists were replaced."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.recheck_seconds:
+            return False
+        self._checked_at = now
+        if file_signature(self.path) == self._signature:
+            return False
+        try:
+            self.current = self._load()
+        except (ValueError, AttributeError, TypeError) as exc:
+            self.last_error = f"{self.path}: {exc}"
+            return False
+        self.last_error = None
+        return True
+
+    def status(self) -> dict:
+        return {
+            "file": self.path if self._signature is not None else None,
+            "checklists": {name: layout.version for name, layout in self.current.layouts.items()},
+            "default": self.current.default.name,
+            "error": self.last_error,
+        }
+
+
+def open_registry(config: dict) -> ChecklistRegistry:
+    """Opens the checklists file configured in config.json or CHECKLISTS_FILE."""
+    return ChecklistRegistry(
+        os.environ.get("CHECKLISTS_FILE") or config.get("checklists_file", DEFAULT_CHECKLISTS_FILE)
+    )
+
+
+class RenderCache:
+    """Bounded LRU of rendered progress keyed on (checklist, email, completion mask, last_updated)."""
+
+    def __init__(self, name: str = "default", max_entries: int = DEFAULT_RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, object]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter = metrics.RENDER_CACHE_REQUESTS.labels(name, "hit")
+        self._miss_counter = metrics.RENDER_CACHE_REQUESTS.labels(name, "miss")
+
+    def get(self, layout: ChecklistLayout, email: str, user: UserRecord, render: Callable[[], object]):
+        """Returns the cached rendering for this state of the user, calling render() on a miss."""
+        key = (layout.fingerprint, email, user.mask, user.last_updated)
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._hit_counter.inc()
+            return value
+        self.misses += 1
+        self._miss_counter.inc()
+        with metrics.RENDER.time():
+            value = render()
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Returns whether an If-None-Match header value matches an ETag."""
+    if if_none_match is None:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def render_progress(layout: ChecklistLayout, cache: Optional[RenderCache], email: str, user: UserRecord,
+                    compact: bool = False) -> Tuple[bytes, Optional[str]]:
+    """
+    Returns the (JSON body, ETag) of a user's progress, from the cache if
+    unchanged. Compact bodies need a cache of their own. Without a cache
+    (unsaved users, whose timestamps are "now" on every read) the body is
+    rendered afresh and has no ETag.
+    """
+    if cache is None:
+        return (layout.render_compact_json(email, user) if compact else layout.render_json(email, user)), None
+    if compact:
+        return cache.get(layout, email, user, lambda: (
+            layout.render_compact_json(email, user), layout.etag(email, user, "compact")
+        ))
+    return cache.get(layout, email, user, lambda: (layout.render_json(email, user), layout.etag(email, user)))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Shared core of the MCP and HTTP servers.
+
+OnboardingCore owns everything both servers need: the storage backend
+(store.py / sqlite_store.py) behind its thread pool, the checklists
+(checklist.py) with the cohort index that follows them, the mentor rules
+(mentors.py), the change feed of user progress (changefeed.py), per-user
+locks and the rendered-progress caches.
+shared_core() creates it once per process, so when the MCP server and the
+FastAPI app run in one process (combined mode, `python server.py
+--http-port 8000`) they serve from the same in-memory store instead of each
+re-reading data.json.
+
+Creating the core reads only config.json and checklists.json: user data is
+loaded on first access (or by preload() ahead of it) and the cohort index on
+the first cohort summary, so a freshly spawned server answers quickly.
+"""
+
+import asyncio
+import os
+from typing import Optional, Tuple
+
+from aggregates import CohortIndex
+from changefeed import ChangeFeed
+from checklist import ChecklistSet, RenderCache, open_registry
+from mentors import MentorDirectory
+from store import KeyedLocks, UserRecord, create_new_user, load_json_file, open_async_store
+
+DATA_FILE = "data.json"
+CONFIG_FILE = "config.json"
+
+
+class OnboardingCore:
+    """Store, checklists and caches shared by every server in a process."""
+
+    def __init__(self, config_file: str = CONFIG_FILE, data_file: str = DATA_FILE):
+        self.config_file = config_file
+        self.closed = False
+        self._preload = None
+        config = load_json_file(config_file)
+
+        # User data storage (backend selected in config_file, JSON by default);
+        # blocking I/O runs in the storage thread pool, off the event loop
+        self.store = open_async_store(config, data_file)
+
+        # Persist unknown users as soon as their progress is read (legacy
+        # behaviour) instead of on their first completed task
+        self.create_users_on_read = os.environ.get(
+            "CREATE_USERS_ON_READ", str(config.get("create_users_on_read", False))
+        ).lower() in ("1", "true", "yes")
+
+        # Serializes concurrent requests for the same user
+        self.user_locks = KeyedLocks()
+
+        # Onboarding checklists from checklists.json (built-in default without
+        # it), compiled once and re-read when the file changes
+        self.checklists = open_registry(config)
+
+        # Rendered progress of recently read users, reused while their record
+        # is unchanged: JSON bodies for HTTP (full and ?compact=true), text for MCP
+        self.json_cache = RenderCache("json")
+        self.compact_cache = RenderCache("json_compact")
+        self.text_cache = RenderCache("text")
+
+        # Mentor rules compiled from config_file, recompiled when it changes
+        self.mentors = MentorDirectory(config_file)
+
+        # Cohort counters for the mentor summary, kept up to date by the store
+        self.store.storage.attach_index(CohortIndex(self.checklists.current))
+
+        # Numbered change events for mentor dashboards (GET /api/admin/events)
+        self.feed = ChangeFeed(self.checklists)
+        self.store.storage.attach_feed(self.feed)
+
+    async def is_mentor(self, email: str) -> bool:
+        """
+        Checks the email against the mentor rules of config.json (kept in
+        memory); the file is re-checked in the storage thread pool, off the
+        event loop.
+        """
+        if self.mentors.refresh_due():
+            await self.store.run(self.mentors.refresh)
+        return self.mentors.is_mentor(email)
+
+    async def current_checklists(self) -> ChecklistSet:
+        """Returns the current checklists, re-reading checklists.json if it changed."""
+        if self.checklists.refresh_due() and await self.store.run(self.checklists.refresh):
+            await self.store.run(self.store.storage.attach_index, CohortIndex(self.checklists.current))
+        return self.checklists.current
+
+    async def get_user(self, email: str) -> Tuple[UserRecord, bool]:
+        """
+        Gets user data as (record, saved). Unknown users get a zero-progress
+        view that is not saved (saved=False); the record is persisted on
+        their first completed task.
+        """
+        user_data = await self.store.get_user(email)
+        if user_data is None:
+            if self.create_users_on_read:
+                return await self.store.create_user(email), True
+            self.store.count_writes_avoided()
+            return create_new_user(), False
+        return user_data, True
+
+    def preload(self, delay: float = 0.0) -> None:
+        """
+        Reads the user data in the storage thread pool after delay seconds,
+        once per process. The store otherwise loads on first access; started
+        while a client is idle, the load is over by its first request.
+        """
+        if self._preload is not None:
+            return
+
+        def start() -> None:
+            self._preload = asyncio.ensure_future(self.store.refresh())
+
+        self._preload = asyncio.get_running_loop().call_later(delay, start)
+
+    def close(self) -> None:
+        """Flushes pending writes and stops the storage thread pool (once)."""
+        if not self.closed:
+            self.closed = True
+            self.store.shutdown()
+
+
+_shared: Optional[OnboardingCore] = None
+
+
+def shared_core() -> OnboardingCore:
+    """Returns the process-wide core, creating it on first use."""
+    global _shared
+    if _shared is None:
+        _shared = OnboardingCore()
+    return _shared
@@ -28,18 +28,23 @@ if ! docker images ${IMAGE_NAME} | grep -q ${IMAGE_NAME}; then
     docker build -t ${IMAGE_NAME}:latest .
 fi
 
-# Create data directory if it doesn't exist
+# Create data directory if it doesn't exist; user data lives there (the
+# snapshot is replaced by rename, with its journal and lock file beside it)
 mkdir -p ./data
+if [ -f ./data.json ] && [ ! -f ./data/data.json ]; then
+    echo -e "${YELLOW}📁 Moving data.json into ./data/...${NC}"
+    cp ./data.json ./data/data.json
+fi
 
 # Start container
 echo -e "${YELLOW}🐳 Starting container...${NC}"
 docker run -d \
     --name ${CONTAINER_NAME} \
     -p ${PORT}:8000 \
-    -v "$(pwd)/data.json:/app/data.json" \
     -v "$(pwd)/config.json:/app/config.json" \
     -v "$(pwd)/data:/app/data" \
     -e PYTHONUNBUFFERED=1 \
+    -e STORAGE_PATH=/app/data/data.json \
     --restart unless-stopped \
     ${IMAGE_NAME}:latest
 
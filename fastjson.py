@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+JSON responses for the hot HTTP endpoints.
+
+Endpoints that answer with data built by the server itself (user records,
+reports, counters) return FastJSONResponse directly: FastAPI then skips
+response_model validation and jsonable_encoder, and the body is encoded in
+one pass. The encoder is orjson when it is installed (`pip install orjson`,
+optional) and the standard library otherwise; both produce the same compact
+UTF-8 JSON.
+"""
+
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    def dumps(value) -> bytes:
+        """Encodes a value as compact UTF-8 JSON."""
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(value) -> bytes:
+        """Encodes a value as compact UTF-8 JSON."""
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """A JSON response for trusted data: no validation, no jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,27 @@
+"""
+gunicorn settings for the HTTP API:
+
+    pip install gunicorn uvicorn-worker
+    gunicorn -c gunicorn.conf.py http_server:app
+
+Workers share data.json (or the SQLite database) through the storage layer's
+cross-process locking. BIND and WEB_CONCURRENCY override the defaults.
+"""
+
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Each worker must open its own store, thread pool and lock file after the
+# fork, so the app is not imported in the master
+preload_app = False
+
+# On SIGTERM workers stop accepting connections, finish in-flight requests,
+# then flush pending writes (FastAPI lifespan shutdown) within this time
+graceful_timeout = 30
+timeout = 60
+
+accesslog = "-"
+errorlog = "-"
@@ -2,32 +2,42 @@
 """
 HTTP API Server for managing employee onboarding checklist.
 FastAPI version for HTTP requests.
+
+Runs as one process (`python http_server.py`) or several:
+`python http_server.py --workers 4`, or gunicorn with gunicorn.conf.py.
+Every worker has its own core over the same data files; the storage layer
+locks and re-reads them across processes (see store.py), so workers stay
+consistent. On shutdown each worker finishes in-flight requests, then
+flushes pending writes.
 """
 
-import json
 import os
+import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException, status
+from functools import partial
+from itertools import islice
+from typing import Dict, Literal, Optional, List, Union
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
-
-# Constants
-DATA_FILE = "data.json"
-CONFIG_FILE = "config.json"
-
-# Onboarding checklist definition
-CHECKLIST = {
-    1: {"day": 1, "task": "Meet your manager"},
-    2: {"day": 1, "task": "Meet your buddy / mentor"},
-    3: {"day": 1, "task": "Read the company handbook"},
-    4: {"day": 1, "task": "Complete basic security training"},
-    5: {"day": 2, "task": "Set up your development environment"},
-    6: {"day": 2, "task": "Join the team stand-up meeting"},
-    7: {"day": 2, "task": "Read the documentation for the main product"},
-    8: {"day": 3, "task": "Shadow a team member during a real task"},
-    9: {"day": 3, "task": "Pick your first small task from the backlog"},
-}
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, StrictInt
+
+import admission
+import bulk
+import fastjson
+import metrics
+import reports
+from checklist import ChecklistSet, etag_matches, render_progress
+from core import shared_core
+from fastjson import FastJSONResponse
+from store import load_json_file
+
+# Store, checklists and caches; shared with the MCP server in combined mode
+core = shared_core()
+
+# Concurrency and rate limits of this worker ("admission" in config.json)
+admission_control = admission.AdmissionControl.from_config(load_json_file(core.config_file))
 
 
 # Pydantic models for request/response validation
@@ -42,16 +52,72 @@ class UserProgress(BaseModel):
 
 class TaskCompleteRequest(BaseModel):
     email: EmailStr
-    task_id: int
+    # Strict: true and 1.0 would otherwise be coerced to task 1
+    task_id: StrictInt
+
+
+class BulkCompleteRequest(BaseModel):
+    items: List[TaskCompleteRequest] = Field(min_length=1, max_length=bulk.MAX_BULK_ITEMS)
+
+
+class BulkProgressRequest(BaseModel):
+    emails: List[EmailStr] = Field(min_length=1, max_length=bulk.MAX_BULK_ITEMS)
 
 
 class MentorRequest(BaseModel):
     mentor_email: EmailStr
+    cursor: Optional[str] = None
+    limit: Optional[int] = Field(default=None, ge=1)
+    # Filters
+    min_progress: Optional[float] = Field(default=None, ge=0, le=100)
+    max_progress: Optional[float] = Field(default=None, ge=0, le=100)
+    created_after: Optional[str] = None
+    created_before: Optional[str] = None
+    updated_after: Optional[str] = None
+    updated_before: Optional[str] = None
+    incomplete_day: Optional[int] = None
+    # Sorting
+    sort: Literal["email", "progress", "created_at", "last_updated"] = "email"
+    order: Literal["asc", "desc"] = "asc"
+    # Rows as arrays under "fields" instead of one object per user
+    compact: bool = False
+
+
+class MentorAuthRequest(BaseModel):
+    mentor_email: EmailStr
+
+
+class SummaryRequest(MentorAuthRequest):
+    checklist: Optional[str] = None
+
+
+class ExportRequest(MentorRequest):
+    format: Literal["ndjson", "csv"] = "ndjson"
 
 
+class UserSummary(BaseModel):
+    checklist: str
+    completed_tasks: List[int]
+    progress_percentage: float
+    completed_count: int
+    total_tasks: int
+    created_at: str
+    last_updated: str
+
+
+# Response models document the API (OpenAPI); the hot endpoints return
+# FastJSONResponse, so their trusted payloads are not validated against them
 class AllUsersProgress(BaseModel):
-    users: dict
+    users: Dict[str, UserSummary]
     total_users: int
+    next_cursor: Optional[str] = None
+
+
+class CompactUsersProgress(BaseModel):
+    fields: List[str]
+    users: List[list]
+    total_users: int
+    next_cursor: Optional[str] = None
 
 
 class TaskInfo(BaseModel):
@@ -63,6 +129,8 @@ class TaskInfo(BaseModel):
 
 class DetailedProgress(BaseModel):
     email: str
+    checklist: str
+    checklist_version: int
     completed_tasks: List[int]
     created_at: str
     last_updated: str
@@ -71,64 +139,26 @@ class DetailedProgress(BaseModel):
     tasks_by_day: dict
 
 
-# Data handling functions (from original server.py)
-def load_json_file(filepath: str) -> dict:
-    """Loads data from JSON file."""
-    if not os.path.exists(filepath):
-        return {}
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-
-def save_json_file(filepath: str, data: dict) -> None:
-    """Saves data to JSON file."""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
-def load_user_data() -> dict:
-    """Loads user data."""
-    return load_json_file(DATA_FILE)
-
-
-def save_user_data(data: dict) -> None:
-    """Saves user data."""
-    save_json_file(DATA_FILE, data)
-
-
-def load_config() -> dict:
-    """Loads configuration."""
-    return load_json_file(CONFIG_FILE)
-
-
-def create_new_user(email: str) -> dict:
-    """Creates a new user with empty progress."""
-    now = datetime.now().isoformat()
-    return {
-        "completed_tasks": [],
-        "created_at": now,
-        "last_updated": now
-    }
-
-
-def get_user(email: str, data: dict) -> dict:
-    """Gets user data or creates a new one."""
-    if email not in data:
-        data[email] = create_new_user(email)
-        save_user_data(data)
-    return data[email]
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    # Graceful shutdown: requests are drained; commit queued writes before exit
+    core.close()
 
 
 # Create FastAPI application
 app = FastAPI(
     title="Onboarding Checklist API",
     description="API for managing employee onboarding checklist",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Bounded concurrency, rate limits and priorities; added first so it runs
+# innermost and rejected requests still show up in the metrics
+app.add_middleware(admission.AdmissionMiddleware, control=admission_control)
+
 # Add CORS for browser requests
 app.add_middleware(
     CORSMiddleware,
@@ -138,6 +168,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route and in-flight requests, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -148,66 +181,77 @@ async def root():
         "endpoints": {
             "get_user_progress": "GET /api/users/{email}/progress",
             "mark_task_complete": "POST /api/users/tasks/complete",
+            "mark_tasks_complete_bulk": "POST /api/users/tasks/complete/bulk",
+            "get_users_progress_bulk": "POST /api/users/progress/bulk",
             "get_all_users": "POST /api/admin/users",
-            "get_checklist": "GET /api/checklist"
+            "export_all_users": "POST /api/admin/users/export",
+            "get_cohort_summary": "POST /api/admin/summary",
+            "stream_progress_events": "GET /api/admin/events",
+            "get_checklist": "GET /api/checklist",
+            "list_checklists": "GET /api/checklists"
         }
     }
 
 
-@app.get("/api/checklist")
-async def get_checklist():
-    """Get full onboarding checklist."""
-    checklist_by_day = {}
-    for task_id, info in CHECKLIST.items():
-        day = info["day"]
-        if day not in checklist_by_day:
-            checklist_by_day[day] = []
-        checklist_by_day[day].append({
-            "id": task_id,
-            "task": info["task"]
-        })
-    
+def cached_response(body: bytes, etag: Optional[str], if_none_match: Optional[str]) -> Response:
+    """Returns 304 if the client already has this ETag, else the pre-rendered JSON body."""
+    if etag is None:
+        return Response(content=body, media_type="application/json")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/api/checklists")
+async def list_checklists():
+    """List available checklists with their versions."""
+    checklists = await core.current_checklists()
     return {
-        "checklist": checklist_by_day,
-        "total_tasks": len(CHECKLIST),
-        "total_days": 3
+        "default": checklists.default.name,
+        "checklists": {
+            name: {"version": layout.version, "total_tasks": layout.total_tasks, "total_days": len(layout.days)}
+            for name, layout in checklists.layouts.items()
+        }
     }
 
 
+@app.get("/api/checklist")
+async def get_checklist(name: Optional[str] = None, email: Optional[str] = None,
+                        if_none_match: Optional[str] = Header(default=None)):
+    """
+    Get full onboarding checklist: the default one, the one called `name`
+    or the one assigned to `email` (rendered once per checklist version).
+    """
+    checklists = await core.current_checklists()
+    if email is not None:
+        layout = checklists.for_user(email)
+    else:
+        try:
+            layout = checklists.get(name)
+        except KeyError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown checklist: {name}")
+    return cached_response(layout.checklist_body, layout.checklist_etag, if_none_match)
+
+
 @app.get("/api/users/{email}/progress", response_model=DetailedProgress)
-async def get_user_progress(email: str):
+async def get_user_progress(email: str, compact: bool = False, if_none_match: Optional[str] = Header(default=None)):
     """
     Get user progress for checklist.
-    If user doesn't exist - created automatically with zero progress.
+    If user doesn't exist - zero progress is returned; the user is saved
+    on their first completed task.
+    With compact=true tasks_by_day is left out.
+    Responses carry an ETag; send it back in If-None-Match to get 304
+    while the user's progress is unchanged.
     """
-    data = load_user_data()
-    user_data = get_user(email, data)
-    
-    completed = set(user_data["completed_tasks"])
-    total_tasks = len(CHECKLIST)
-    progress_percentage = (len(completed) / total_tasks * 100) if total_tasks > 0 else 0
+    layout = (await core.current_checklists()).for_user(email)
+    async with core.user_locks.hold(email):
+        user_data, saved = await core.get_user(email)
     
-    # Group tasks by day
-    tasks_by_day = {}
-    for day in [1, 2, 3]:
-        tasks_by_day[f"day_{day}"] = []
-        day_tasks = [tid for tid, info in CHECKLIST.items() if info["day"] == day]
-        for task_id in day_tasks:
-            tasks_by_day[f"day_{day}"].append({
-                "id": task_id,
-                "task": CHECKLIST[task_id]["task"],
-                "completed": task_id in completed
-            })
-    
-    return {
-        "email": email,
-        "completed_tasks": sorted(list(completed)),
-        "created_at": user_data["created_at"],
-        "last_updated": user_data["last_updated"],
-        "progress_percentage": round(progress_percentage, 1),
-        "total_tasks": total_tasks,
-        "tasks_by_day": tasks_by_day
-    }
+    # Unsaved users are neither cached nor given an ETag: they would only
+    # push real users out of the cache and never revalidate
+    cache = None if not saved else core.compact_cache if compact else core.json_cache
+    body, etag = render_progress(layout, cache, email, user_data, compact=compact)
+    return cached_response(body, etag, if_none_match)
 
 
 @app.post("/api/users/tasks/complete")
@@ -218,91 +262,232 @@ async def mark_task_complete(request: TaskCompleteRequest):
     email = request.email
     task_id = request.task_id
     
-    # Validate task_id
-    if task_id not in CHECKLIST:
+    # Validate task_id against the user's checklist
+    layout = (await core.current_checklists()).for_user(email)
+    if task_id not in layout.tasks:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid task_id. Must be between 1 and 9. Got: {task_id}"
+            detail=f"Invalid task_id. Must be {layout.valid_ids}. Got: {task_id}"
         )
     
-    # Load data
-    data = load_user_data()
-    user_data = get_user(email, data)
+    # Add task if not already completed (creates the user if needed)
+    async with core.user_locks.hold(email):
+        user_data, was_completed = await core.store.complete_task(email, task_id)
     
-    # Add task if not already completed
-    was_completed = task_id in user_data["completed_tasks"]
-    if not was_completed:
-        user_data["completed_tasks"].append(task_id)
-        user_data["completed_tasks"].sort()
-        user_data["last_updated"] = datetime.now().isoformat()
-        save_user_data(data)
-    
-    completed = set(user_data["completed_tasks"])
-    progress_percentage = (len(completed) / len(CHECKLIST) * 100)
-    
-    return {
+    return FastJSONResponse({
         "success": True,
         "message": f"Task {task_id} marked as completed" if not was_completed else f"Task {task_id} was already completed",
-        "task": CHECKLIST[task_id]["task"],
+        "task": layout.tasks[task_id]["task"],
         "email": email,
-        "completed_tasks": sorted(list(completed)),
-        "progress_percentage": round(progress_percentage, 1),
+        "checklist": layout.name,
+        "completed_tasks": user_data.completed_tasks,
+        "progress_percentage": layout.progress_percentage(user_data),
         "was_already_completed": was_completed
-    }
+    })
 
 
-@app.post("/api/admin/users", response_model=AllUsersProgress)
-async def get_all_users_progress(request: MentorRequest):
+@app.post("/api/users/tasks/complete/bulk")
+async def mark_tasks_complete_bulk(request: BulkCompleteRequest):
     """
-    Get progress for all users.
-    Only available to mentors from config.json.
+    Mark many (email, task_id) pairs as completed in one storage transaction.
+    Returns one result per item, in request order; items with an invalid
+    task_id fail individually without affecting the others.
     """
-    mentor_email = request.mentor_email
-    
-    # Check if email is a mentor
-    config = load_config()
-    mentors = config.get("mentors", [])
-    
-    if mentor_email not in mentors:
+    checklists = await core.current_checklists()
+    results = await bulk.complete_tasks(
+        core.store, checklists, [(item.email, item.task_id) for item in request.items]
+    )
+    return FastJSONResponse({
+        "results": results,
+        "completed": sum(1 for r in results if r["success"] and not r["was_already_completed"]),
+        "already_completed": sum(1 for r in results if r["success"] and r["was_already_completed"]),
+        "failed": sum(1 for r in results if not r["success"])
+    })
+
+
+@app.post("/api/users/progress/bulk")
+async def get_users_progress_bulk(request: BulkProgressRequest):
+    """
+    Get progress summaries for many users with one storage read.
+    Unknown emails get zero progress with "exists": false.
+    """
+    checklists = await core.current_checklists()
+    users = await bulk.get_progress(
+        core.store, checklists, request.emails, create_missing=core.create_users_on_read
+    )
+    return FastJSONResponse({"users": users})
+
+
+async def check_mentor(mentor_email: str) -> None:
+    """Raises 403 unless the email is a mentor by the rules in config.json."""
+    if not await core.is_mentor(mentor_email):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Access denied. {mentor_email} is not authorized as a mentor."
         )
+
+
+def report_filter(request: MentorRequest, checklists: ChecklistSet):
+    """Builds the user predicate for a mentor request's filters."""
+    return reports.make_filter(
+        checklists,
+        min_progress=request.min_progress,
+        max_progress=request.max_progress,
+        created_after=request.created_after,
+        created_before=request.created_before,
+        updated_after=request.updated_after,
+        updated_before=request.updated_before,
+        incomplete_day=request.incomplete_day
+    )
+
+
+@app.post("/api/admin/users", response_model=Union[AllUsersProgress, CompactUsersProgress])
+async def get_all_users_progress(request: MentorRequest):
+    """
+    Get progress for all users.
+    Only available to mentors from config.json.
+    Supports filters and sorting; pass `limit` to page through users and
+    feed `next_cursor` back as `cursor`. With `compact` users are rows of
+    values in the order of `fields` (see CompactUsersProgress).
+    """
+    await check_mentor(request.mentor_email)
+    checklists = await core.current_checklists()
     
-    # Load all users data
-    data = load_user_data()
+    # Filter, sort and cut one page of users (all users if no limit)
+    try:
+        page, next_cursor = await core.store.run(partial(
+            reports.query_users, core.store.storage, checklists, report_filter(request, checklists),
+            sort=request.sort, descending=request.order == "desc",
+            cursor=request.cursor, limit=request.limit
+        ))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     
-    users_info = {}
-    for email, user_data in data.items():
-        completed = len(user_data["completed_tasks"])
-        total = len(CHECKLIST)
-        percentage = (completed / total * 100) if total > 0 else 0
-        
-        users_info[email] = {
-            "completed_tasks": user_data["completed_tasks"],
-            "progress_percentage": round(percentage, 1),
-            "completed_count": completed,
-            "total_tasks": total,
-            "created_at": user_data["created_at"],
-            "last_updated": user_data["last_updated"]
-        }
+    total_users = await core.store.count_users()
+    if request.compact:
+        return FastJSONResponse({
+            "fields": reports.COMPACT_FIELDS,
+            "users": [reports.user_row(email, user_data, checklists.for_user(email)) for email, user_data in page],
+            "total_users": total_users,
+            "next_cursor": next_cursor
+        })
     
-    return {
-        "users": users_info,
-        "total_users": len(users_info)
+    users_info = {
+        email: reports.user_summary(user_data, checklists.for_user(email))
+        for email, user_data in page
     }
+    
+    return FastJSONResponse({
+        "users": users_info,
+        "total_users": total_users,
+        "next_cursor": next_cursor
+    })
+
+
+@app.post("/api/admin/users/export")
+async def export_users_progress(request: ExportRequest):
+    """
+    Stream the mentor report as NDJSON or CSV.
+    Accepts the same filters and sorting as /api/admin/users; rows are
+    generated in chunks of a few hundred instead of building the whole
+    report in memory.
+    """
+    await check_mentor(request.mentor_email)
+    checklists = await core.current_checklists()
+    
+    try:
+        rows = reports.iter_report(
+            core.store.storage, checklists, report_filter(request, checklists),
+            sort=request.sort, descending=request.order == "desc", cursor=request.cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if request.limit is not None:
+        rows = islice(rows, request.limit)
+    if request.format == "csv":
+        return StreamingResponse(reports.export_csv(rows, checklists), media_type="text/csv")
+    return StreamingResponse(reports.export_ndjson(rows, checklists), media_type="application/x-ndjson")
+
+
+@app.post("/api/admin/summary")
+async def get_cohort_summary(request: SummaryRequest):
+    """
+    Get cohort counters of one checklist (default one if not given):
+    completions per task, per day (completed / stuck), users per number of
+    completed tasks and per creation week.
+    Answered from an incrementally maintained index, not by scanning users.
+    """
+    await check_mentor(request.mentor_email)
+    await core.current_checklists()
+    try:
+        return FastJSONResponse(await core.store.cohort_summary(request.checklist))
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown checklist: {request.checklist}")
+
+
+@app.get("/api/admin/events")
+async def stream_progress_events(mentor_email: str, since: Optional[str] = None,
+                                 last_event_id: Optional[str] = Header(default=None)):
+    """
+    Server-sent events for every user change (new users, completed tasks),
+    so dashboards update incrementally instead of polling /api/admin/users.
+    Reconnecting clients resume after Last-Event-ID (or `since`); when that
+    is impossible they get a reset event and should reload the report.
+    Streams end after a while; EventSource reconnects and resumes.
+    """
+    await check_mentor(mentor_email)
+    return StreamingResponse(
+        core.feed.stream(last_event_id or since, poll=core.store.refresh),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring."""
+    await core.current_checklists()
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "worker_pid": os.getpid(),
+        "storage": dict(core.store.stats),
+        "render_cache": core.json_cache.stats(),
+        "json_encoder": fastjson.ENCODER,
+        "checklists": core.checklists.status(),
+        "mentors": core.mentors.status(),
+        "change_feed": core.feed.status(),
+        "admission": admission_control.status()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics: request latency per route, per-stage timers, cache and storage counters."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.Registry.content_type)
+
+
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    parser = argparse.ArgumentParser(description="Onboarding checklist HTTP API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)),
+                        help="worker processes sharing the data files (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args()
+    if args.workers > 1:
+        # Hand over to the uvicorn CLI: its spawned workers then import only
+        # http_server (not this __main__ module too), each with its own core
+        os.execv(sys.executable, [
+            sys.executable, "-m", "uvicorn", "http_server:app",
+            "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+            "--host", args.host, "--port", str(args.port), "--workers", str(args.workers),
+            "--timeout-graceful-shutdown", str(args.graceful_timeout),
+        ])
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=args.graceful_timeout)
 
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Mentor authorization rules from config.json.
+
+The rules are compiled once into frozensets, so an admin request checks an
+email with at most two set lookups and never reads the disk. MentorDirectory
+notices edits of config.json by its (inode, mtime, size) signature, checked
+at most once per recheck interval, and recompiles the rules. refresh() does
+file I/O: the servers call it in the storage thread pool when refresh_due().
+
+config.json keys:
+- "mentors": emails and "@domain" entries (everyone at that domain);
+- "groups": named lists of emails / "@domain" entries, e.g. one per team;
+- "mentor_groups": names of the groups whose members are mentors.
+"""
+
+import json
+import time
+from typing import FrozenSet, Iterable, Optional
+
+from store import file_signature
+
+DEFAULT_RECHECK_SECONDS = 1.0
+
+
+class MentorRules:
+    """Compiled mentor rules: exact emails and "@domain" suffixes, lowercased."""
+
+    __slots__ = ("emails", "domains")
+
+    def __init__(self, entries: Iterable[str] = ()):
+        emails, domains = set(), set()
+        for entry in entries:
+            if not isinstance(entry, str) or not entry:
+                raise ValueError(f"mentor entries must be emails or \"@domain\", got {entry!r}")
+            entry = entry.strip().lower()
+            (domains if entry.startswith("@") else emails).add(entry)
+        self.emails: FrozenSet[str] = frozenset(emails)
+        self.domains: FrozenSet[str] = frozenset(domains)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "MentorRules":
+        """Compiles "mentors", "groups" and "mentor_groups"; raises ValueError if invalid."""
+        mentors = config.get("mentors", [])
+        groups = config.get("groups", {})
+        mentor_groups = config.get("mentor_groups", [])
+        if not isinstance(mentors, list) or not isinstance(mentor_groups, list) or not isinstance(groups, dict):
+            raise ValueError("\"mentors\" and \"mentor_groups\" must be lists, \"groups\" an object")
+
+        entries = list(mentors)
+        for name in mentor_groups:
+            members = groups.get(name)
+            if not isinstance(members, list):
+                raise ValueError(f"mentor group {name!r} is not defined in \"groups\"")
+            entries.extend(members)
+        return cls(entries)
+
+    def __contains__(self, email: str) -> bool:
+        email = email.lower()
+        return email in self.emails or email[email.find("@"):] in self.domains
+
+    def __len__(self) -> int:
+        return len(self.emails) + len(self.domains)
+
+
+class MentorDirectory:
+    """
+    The current MentorRules from a config file. An edit that fails to parse
+    or validate keeps the previous rules and is reported in last_error.
+    """
+
+    def __init__(self, path: str, recheck_seconds: float = DEFAULT_RECHECK_SECONDS):
+        self.path = path
+        self.recheck_seconds = recheck_seconds
+        self.rules = MentorRules()
+        self.last_error: Optional[str] = None
+        self._signature = None
+        self._checked_at = float("-inf")
+        self.refresh(force=True)
+
+    def refresh_due(self) -> bool:
+        """Whether the recheck interval has passed, i.e. refresh() would look at the file."""
+        return time.monotonic() - self._checked_at >= self.recheck_seconds
+
+    def refresh(self, force: bool = False) -> bool:
+        """Recompiles the rules if the file changed; returns True if they were replaced."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.recheck_seconds:
+            return False
+        self._checked_at = now
+        signature = file_signature(self.path)
+        if signature == self._signature and not force:
+            return False
+        self._signature = signature
+        try:
+            if signature is None:
+                config = {}
+            else:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            self.rules = MentorRules.from_config(config)
+        except (OSError, ValueError, AttributeError, TypeError) as exc:
+            self.last_error = f"{self.path}: {exc}"
+            return False
+        self.last_error = None
+        return True
+
+    def is_mentor(self, email: str) -> bool:
+        """Checks an email against the current mentor rules (no I/O; see refresh())."""
+        return email in self.rules
+
+    def status(self) -> dict:
+        return {
+            "emails": len(self.rules.emails),
+            "domains": len(self.rules.domains),
+            "error": self.last_error,
+        }
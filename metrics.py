@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the HTTP and MCP servers, without a client library.
+
+Counters, gauges and histograms live in one process-wide REGISTRY and are
+rendered in the Prometheus text format by REGISTRY.render() (served at
+/metrics). Updates are thread-safe, since storage calls run in the storage
+thread pool. Each metric takes its label values positionally through
+labels(), which returns a child to update; callers on hot paths keep it.
+
+Time is broken down by stage in onboarding_stage_seconds:
+- storage_load: reading data files / database rows;
+- storage_save: durable writes (journal append, compaction, SQLite commit);
+- serialize: encoding records for storage;
+- render: rendering progress responses (render cache misses).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric family: one child per combination of label values."""
+
+    kind = "untyped"
+    suffix = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Returns the child for these label values, creating it on first use."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, key: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        name = self.name + self.suffix
+        lines = [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._samples(key, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    @contextmanager
+    def track_inprogress(self):
+        """Counts the block as in flight while it runs."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Counter(Metric):
+    kind = "counter"
+    suffix = "_total"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def _samples(self, key, child) -> List[str]:
+        return [f"{self.name}{self.suffix}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def _samples(self, key, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        position = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[position] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observes the duration of the block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def _samples(self, key, child) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics of a process, rendered together for /metrics."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge("http_requests_in_flight", "HTTP requests being served"))
+HTTP_QUEUED = REGISTRY.register(Gauge("http_requests_queued", "HTTP requests waiting for a concurrency slot"))
+HTTP_REJECTED = REGISTRY.register(Counter(
+    "http_requests_rejected", "HTTP requests refused by admission control", ["kind", "reason"]
+))
+MCP_TOOL_SECONDS = REGISTRY.register(Histogram(
+    "mcp_tool_duration_seconds", "MCP tool call latency by tool", ["tool", "outcome"]
+))
+MCP_IN_FLIGHT = REGISTRY.register(Gauge("mcp_tool_calls_in_flight", "MCP tool calls being run"))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "onboarding_stage_seconds", "Time spent per processing stage", ["stage"]
+))
+STORAGE_WRITE_BYTES = REGISTRY.register(Histogram(
+    "onboarding_storage_write_bytes", "Bytes written per durable save", ["kind"], buckets=BYTES_BUCKETS
+))
+STORAGE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "onboarding_storage_calls_in_flight", "Calls queued or running in the storage thread pool"
+))
+RENDER_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "onboarding_render_cache_requests", "Render cache lookups by result", ["cache", "result"]
+))
+WRITES_AVOIDED = REGISTRY.register(Counter(
+    "onboarding_writes_avoided", "Reads of unknown users answered without saving them"
+))
+
+STORAGE_LOAD = STAGE_SECONDS.labels("storage_load")
+STORAGE_SAVE = STAGE_SECONDS.labels("storage_save")
+SERIALIZE = STAGE_SECONDS.labels("serialize")
+RENDER = STAGE_SECONDS.labels("render")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording HTTP latency per route template (e.g.
+    /api/users/{email}/progress), so per-user paths don't create series.
+    Requests that match no route are recorded as "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels()
+        started = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status).observe(time.perf_counter() - started)
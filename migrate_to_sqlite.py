@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+One-shot migration of data.json files into the SQLite backend.
+
+Each JSON file is read together with its journal (data.json.journal), so
+changes not yet compacted are migrated too. Several files can be merged into
+one database; running the migration twice is harmless.
+
+Usage:
+    python migrate_to_sqlite.py data.json [other.json ...] --db data.db
+
+Then select the backend in config.json:
+    "storage": {"backend": "sqlite", "path": "data.db"}
+"""
+
+import argparse
+import sys
+
+from sqlite_store import SqliteStore
+from store import JsonStore
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="data.json files to import")
+    parser.add_argument("--db", default="data.db", help="SQLite database file (default: data.db)")
+    args = parser.parse_args()
+
+    target = SqliteStore(args.db)
+    for source in args.sources:
+        data = JsonStore(source).load()
+        imported = target.import_users(data)
+        print(f"{source}: imported {imported} users")
+    print(f"{args.db}: {target.count_users()} users total")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
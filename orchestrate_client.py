@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Client for the watsonx Orchestrate messages API, used by streamlit_app.py.
+
+One OrchestrateClient keeps a pooled requests.Session, so consecutive chat
+messages reuse the open TCP/TLS connection instead of a new handshake each.
+A message is sent again only when it surely was not processed: after an
+error opening the connection, or a 429/503 answer with Retry-After (after
+the time it asks for). Other errors, 502/504 included, may come after the
+agent got the message, so they are not retried: that would post the user's
+message twice.
+
+By default a message is a plain JSON request answered with one JSON body,
+{"output": {"text": ...}}. With stream=True (ORCHESTRATE_STREAM=1 in
+streamlit_app.py) stream_message() asks for a streamed answer and yields
+text as it arrives: server-sent events, one `data: {"output": {"text":
+"<chunk>"}}` line per chunk, ended by `data: [DONE]`. A server answering a
+streaming request with one JSON body works too. Enable it only for an
+instance known to stream in this format. benchmarks/mock_orchestrate.py
+serves both locally.
+"""
+
+import json
+from typing import Iterator, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (5, 30)  # seconds to connect, seconds between received chunks
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = frozenset({429, 503})  # retried only with a Retry-After header
+
+
+class OrchestrateError(Exception):
+    """An error answer from the Orchestrate API (after retries)."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class PostRetry(Retry):
+    """Retries of a POST: connection errors, and RETRY_STATUSES answers that carry Retry-After."""
+
+    RETRY_AFTER_STATUS_CODES = RETRY_STATUSES
+
+
+class OrchestrateClient:
+    """Sends chat messages over one pooled session, shared by every chat session of the app."""
+
+    def __init__(self, base_url: str, api_key: str, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF, pool_size: int = 10,
+                 verify: Union[bool, str] = True, stream: bool = False):
+        self.url = f"{base_url.rstrip('/')}/v1/messages"
+        self.timeout = timeout
+        self.stream = stream
+        # Passed per request: requests lets REQUESTS_CA_BUNDLE override session.verify
+        self.verify = verify
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        # No read or other retries: once the request is sent its outcome is unknown
+        retry = PostRetry(
+            total=retries, connect=retries, read=0, other=0, status=retries, backoff_factor=backoff,
+            allowed_methods=frozenset({"POST"}), respect_retry_after_header=True, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def stream_message(self, text: str) -> Iterator[str]:
+        """
+        Sends a message and yields the answer text chunk by chunk (all at once
+        unless streaming is enabled). Raises OrchestrateError on an error
+        answer, requests.RequestException if the server can't be reached.
+        """
+        if not self.stream:
+            yield self.send_message(text)
+            return
+        response = self.session.post(
+            self.url, json={"input": {"text": text}, "stream": True}, timeout=self.timeout, stream=True,
+            verify=self.verify, headers={"Accept": "text/event-stream, application/json"},
+        )
+        with response:
+            if response.status_code != 200:
+                raise OrchestrateError(response.status_code, response.text)
+            if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                yield response.json().get("output", {}).get("text", "")
+                return
+            # chunk_size=None: hand over each network chunk as soon as it arrives.
+            # Read past [DONE] to the end, so the connection goes back to the pool
+            done = False
+            for line in response.iter_lines(chunk_size=None):
+                if done or not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    done = True
+                    continue
+                chunk = json.loads(data).get("output", {}).get("text", "")
+                if chunk:
+                    yield chunk
+
+    def send_message(self, text: str) -> str:
+        """Sends a message and returns the whole answer."""
+        if self.stream:
+            return "".join(self.stream_message(text))
+        response = self.session.post(self.url, json={"input": {"text": text}}, timeout=self.timeout,
+                                     verify=self.verify)
+        if response.status_code != 200:
+            raise OrchestrateError(response.status_code, response.text)
+        return response.json().get("output", {}).get("text", "")
+
+    def close(self) -> None:
+        self.session.close()
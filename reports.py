@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Mentor report queries over any Storage backend.
+
+Users are streamed from the store, filtered, optionally sorted and cut into
+pages with an opaque keyset cursor; export_ndjson() / export_csv() turn the
+same stream into text chunks without building the whole report in memory.
+
+Filters (all optional):
+- min_progress / max_progress: completion percentage range (inclusive);
+- created_after / created_before, updated_after / updated_before: ISO
+  timestamps or dates, compared as strings (after is inclusive, before is
+  exclusive);
+- incomplete_day: only users with at least one open task on that day.
+
+Progress is computed against the checklist assigned to each user.
+"""
+
+import base64
+import csv
+import io
+import json
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from checklist import ChecklistLayout, ChecklistSet
+from store import UserRecord
+
+SORT_KEYS = ("email", "progress", "created_at", "last_updated")
+
+CSV_FIELDS = [
+    "email", "checklist", "completed_count", "total_tasks", "progress_percentage",
+    "completed_tasks", "created_at", "last_updated"
+]
+
+# Users per chunk of a streamed export: each chunk is one trip through the
+# server's thread pool and one send, too costly to pay per user
+EXPORT_CHUNK_ROWS = 500
+
+# Columns of the compact mentor report: one array per user instead of an object
+COMPACT_FIELDS = [
+    "email", "checklist", "completed_tasks", "progress_percentage", "completed_count",
+    "created_at", "last_updated"
+]
+
+
+def user_summary(user: UserRecord, layout: ChecklistLayout) -> dict:
+    """Builds the per-user entry of the mentor report."""
+    return {
+        "checklist": layout.name,
+        "completed_tasks": user.completed_tasks,
+        "progress_percentage": layout.progress_percentage(user),
+        "completed_count": layout.completed_count(user),
+        "total_tasks": layout.total_tasks,
+        "created_at": user.created_at,
+        "last_updated": user.last_updated
+    }
+
+
+def user_row(email: str, user: UserRecord, layout: ChecklistLayout) -> list:
+    """Builds the per-user row of the compact mentor report, in COMPACT_FIELDS order."""
+    return [
+        email, layout.name, user.completed_tasks, layout.progress_percentage(user),
+        layout.completed_count(user), user.created_at, user.last_updated
+    ]
+
+
+def make_filter(checklists: ChecklistSet, min_progress: Optional[float] = None, max_progress: Optional[float] = None,
+                created_after: Optional[str] = None, created_before: Optional[str] = None,
+                updated_after: Optional[str] = None, updated_before: Optional[str] = None,
+                incomplete_day: Optional[int] = None):
+    """Returns a predicate over (email, user record) for the given filters."""
+    def matches(email: str, user: UserRecord) -> bool:
+        layout = checklists.for_user(email)
+        if min_progress is not None or max_progress is not None:
+            progress = layout.progress_percentage(user)
+            if min_progress is not None and progress < min_progress:
+                return False
+            if max_progress is not None and progress > max_progress:
+                return False
+        if created_after is not None and user.created_at < created_after:
+            return False
+        if created_before is not None and user.created_at >= created_before:
+            return False
+        if updated_after is not None and user.last_updated < updated_after:
+            return False
+        if updated_before is not None and user.last_updated >= updated_before:
+            return False
+        if incomplete_day is not None:
+            day_mask = layout.day_masks.get(incomplete_day, 0)
+            if user.mask & day_mask == day_mask:
+                return False
+        return True
+
+    return matches
+
+
+def encode_cursor(sort: str, key, email: str) -> str:
+    """Encodes a (sort key, email) position in a report as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps([sort, key, email]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    """Decodes a cursor from encode_cursor(); raises ValueError if invalid."""
+    try:
+        cursor_sort, key, email = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort={cursor_sort}, not sort={sort}")
+    # The key is compared with the sort keys of users: it must have their type
+    key_types = (int, float) if sort == "progress" else str
+    if not isinstance(email, str) or not isinstance(key, key_types) or isinstance(key, bool):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key, email
+
+
+def iter_report(storage, checklists: ChecklistSet, matches=None, sort: str = "email", descending: bool = False,
+                cursor: Optional[str] = None) -> Iterator[Tuple[object, str, UserRecord]]:
+    """
+    Returns an iterator of (sort key, email, record) for matching users in
+    report order, starting after `cursor`. Email order streams straight from
+    the store; other orders collect matching users first.
+    Raises ValueError for an unknown sort or an invalid cursor.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Invalid sort: {sort}. Must be one of: {', '.join(SORT_KEYS)}")
+    position = decode_cursor(cursor, sort) if cursor else None
+    return _iter_report(storage, checklists, matches, sort, descending, position)
+
+
+def _iter_report(storage, checklists: ChecklistSet, matches, sort: str, descending: bool,
+                 position: Optional[Tuple[object, str]]) -> Iterator[Tuple[object, str, UserRecord]]:
+    if sort == "email" and not descending:
+        after = position[1] if position else None
+        for email, user in storage.iter_users(after=after):
+            if matches is None or matches(email, user):
+                yield email, email, user
+        return
+
+    def key_of(email: str, user: UserRecord):
+        if sort == "email":
+            return email
+        if sort == "progress":
+            return checklists.for_user(email).progress_percentage(user)
+        return getattr(user, sort)
+
+    rows = []
+    for email, user in storage.iter_users():
+        if matches is None or matches(email, user):
+            rows.append((key_of(email, user), email, user))
+    rows.sort(key=lambda row: (row[0], row[1]), reverse=descending)
+
+    start = 0
+    if position is not None:
+        if descending:
+            start = next((i for i, row in enumerate(rows) if (row[0], row[1]) < position), len(rows))
+        else:
+            start = next((i for i, row in enumerate(rows) if (row[0], row[1]) > position), len(rows))
+    yield from rows[start:]
+
+
+def query_users(storage, checklists: ChecklistSet, matches=None, sort: str = "email", descending: bool = False,
+                cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Tuple[str, UserRecord]], Optional[str]]:
+    """
+    Returns one page of (email, record) pairs and the cursor for the next page.
+    Raises ValueError for a limit below 1, besides iter_report()'s errors.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError(f"Invalid limit: {limit}. Must be at least 1")
+    rows = iter_report(storage, checklists, matches, sort, descending, cursor)
+    page = list(islice(rows, limit + 1 if limit is not None else None))
+    next_cursor = None
+    if limit is not None and len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(sort, page[-1][0], page[-1][1])
+    return [(email, user) for _, email, user in page], next_cursor
+
+
+def _chunks(rows: Iterator[Tuple[object, str, UserRecord]]) -> Iterator[list]:
+    """Groups report rows into lists of up to EXPORT_CHUNK_ROWS."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_ndjson(rows: Iterator[Tuple[object, str, UserRecord]], checklists: ChecklistSet) -> Iterator[str]:
+    """Yields JSON lines, one per user, EXPORT_CHUNK_ROWS lines per chunk."""
+    for chunk in _chunks(rows):
+        yield "".join(
+            json.dumps({"email": email, **user_summary(user, checklists.for_user(email))}, ensure_ascii=False) + "\n"
+            for _, email, user in chunk
+        )
+
+
+def export_csv(rows: Iterator[Tuple[object, str, UserRecord]], checklists: ChecklistSet) -> Iterator[str]:
+    """Yields a CSV header and CSV lines, one per user, EXPORT_CHUNK_ROWS lines per chunk."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for chunk in _chunks(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        for _, email, user in chunk:
+            row = {"email": email, **user_summary(user, checklists.for_user(email))}
+            row["completed_tasks"] = " ".join(str(task_id) for task_id in row["completed_tasks"])
+            writer.writerow(row)
+        yield buffer.getvalue()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Moves user data to another number of shards (see sharding.py).
+
+Reads every user of the current layout (snapshots and journals), writes
+them to the files of the new layout, checks that no user was lost and
+renames the old files to *.bak (it refuses to start while earlier *.bak
+files would be overwritten). One shard is the plain unsharded file, so
+this also shards an existing data.json and merges shards back into one.
+Stop the servers first: changes made while resharding would be lost.
+
+The backend and path come from config.json / the environment like for the
+servers (STORAGE_BACKEND, STORAGE_PATH); the current number of shards is
+found on disk.
+
+Usage:
+    python reshard.py --shards 4
+    python reshard.py --shards 1 --path data.db --backend sqlite
+
+Then set "storage": {"shards": 4} in config.json (or STORAGE_SHARDS=4).
+"""
+
+import argparse
+import os
+import sys
+
+from sharding import find_layouts, has_data, open_layout, shard_paths, write_shards
+from store import load_json_file
+
+# Files that belong to one store, next to its main file
+SIDE_FILES = {"json": [".journal", ".lock"], "sqlite": ["-wal", "-shm"]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, required=True, help="new number of shards")
+    parser.add_argument("--from", dest="source", type=int,
+                        help="current number of shards (default: the layout found on disk)")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--backend", choices=["json", "sqlite"])
+    parser.add_argument("--path", help="data file of the unsharded layout (default: data.json / data.db)")
+    args = parser.parse_args()
+
+    settings = load_json_file(args.config).get("storage", {})
+    backend = args.backend or os.environ.get("STORAGE_BACKEND", settings.get("backend", "json"))
+    path = args.path or os.environ.get("STORAGE_PATH", settings.get("path")) or (
+        "data.json" if backend == "json" else "data.db"
+    )
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+
+    layouts = find_layouts(path)
+    source = args.source
+    if source is None:
+        if len(layouts) != 1:
+            found = ", ".join(map(str, layouts)) or "none"
+            print(f"{path}: expected one layout on disk, found shard counts: {found}; pass --from")
+            return 1
+        source = layouts[0]
+    if source == args.shards:
+        print(f"{path}: already in {source} shard(s)")
+        return 0
+    targets = shard_paths(path, args.shards)
+    if any(has_data(target) for target in targets):
+        print(f"{path}: files of a {args.shards}-shard layout already exist; move them away first")
+        return 1
+
+    old_files = [
+        name for source_path in shard_paths(path, source)
+        for name in [source_path] + [source_path + suffix for suffix in SIDE_FILES.get(backend, [])]
+    ]
+    backups = [name + ".bak" for name in old_files if os.path.exists(name + ".bak")]
+    if backups:
+        print(f"{path}: backups of an earlier reshard exist ({', '.join(backups)}); move them away first")
+        return 1
+
+    store = open_layout(backend, path, source)
+    users = dict(store.load())
+    store.close()
+    counts = write_shards(backend, path, args.shards, users)
+
+    check = open_layout(backend, path, args.shards)
+    total = check.count_users()
+    check.close()
+    if total != len(users):
+        print(f"{path}: wrote {total} users, expected {len(users)}; old files kept")
+        return 1
+
+    for name in old_files:
+        if os.path.exists(name):
+            os.replace(name, name + ".bak")
+    print(f"{path}: moved {len(users)} users from {source} to {args.shards} shard(s), per shard: {counts}")
+    print(f'Old files renamed to *.bak. Set "storage": {{"shards": {args.shards}}} in {args.config} '
+          f"or STORAGE_SHARDS={args.shards}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,107 +3,63 @@
 MCP Server for managing employee onboarding checklist.
 """
 
-import json
+import argparse
+import asyncio
 import os
-from datetime import datetime
-from typing import Any
+import time
+from functools import partial
+from typing import Any, Optional
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 import mcp.server.stdio
 
-# Constants
-DATA_FILE = "data.json"
-CONFIG_FILE = "config.json"
-
-# Onboarding checklist definition
-CHECKLIST = {
-    1: {"day": 1, "task": "Meet your manager"},
-    2: {"day": 1, "task": "Meet your buddy / mentor"},
-    3: {"day": 1, "task": "Read the company handbook"},
-    4: {"day": 1, "task": "Complete basic security training"},
-    5: {"day": 2, "task": "Set up your development environment"},
-    6: {"day": 2, "task": "Join the team stand-up meeting"},
-    7: {"day": 2, "task": "Read the documentation for the main product"},
-    8: {"day": 3, "task": "Shadow a team member during a real task"},
-    9: {"day": 3, "task": "Pick your first small task from the backlog"},
-}
-
-
-def load_json_file(filepath: str) -> dict:
-    """Loads data from JSON file."""
-    if not os.path.exists(filepath):
-        return {}
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-
-def save_json_file(filepath: str, data: dict) -> None:
-    """Saves data to JSON file."""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
-def load_user_data() -> dict:
-    """Loads user data."""
-    return load_json_file(DATA_FILE)
-
-
-def save_user_data(data: dict) -> None:
-    """Saves user data."""
-    save_json_file(DATA_FILE, data)
-
+import bulk
+import metrics
+import reports
+from checklist import ChecklistLayout, ChecklistSet, is_task_id
+from core import shared_core
+from store import UserRecord
 
-def load_config() -> dict:
-    """Loads configuration."""
-    return load_json_file(CONFIG_FILE)
+# Store, checklists and caches; shared with the HTTP app in combined mode
+core = shared_core()
 
 
-def create_new_user(email: str) -> dict:
-    """Creates a new user with empty progress."""
-    now = datetime.now().isoformat()
-    return {
-        "completed_tasks": [],
-        "created_at": now,
-        "last_updated": now
-    }
+def format_progress(email: str, user_data: UserRecord, layout: ChecklistLayout, cached: bool = True) -> str:
+    """Formats user progress in readable format (cached while a saved user is unchanged)."""
+    if not cached:
+        return layout.render_text(email, user_data)
+    return core.text_cache.get(layout, email, user_data, partial(layout.render_text, email, user_data))
 
 
-def get_user(email: str, data: dict) -> dict:
-    """Gets user data or creates a new one."""
-    if email not in data:
-        data[email] = create_new_user(email)
-        save_user_data(data)
-    return data[email]
-
-
-def format_progress(email: str, user_data: dict) -> str:
-    """Formats user progress in readable format."""
-    completed = set(user_data["completed_tasks"])
+def format_cohort_summary(summary: dict) -> str:
+    """Formats cohort counters in readable format."""
+    result = ["Cohort Onboarding Summary", "=" * 50, ""]
+    result.append(f"Checklist: {summary['checklist']} (version {summary['checklist_version']})")
+    result.append(f"Users: {summary['total_users']} ({summary['finished']} finished)")
+    result.append("")
     
-    result = [f"Onboarding Progress for: {email}"]
-    result.append(f"Started: {user_data['created_at']}")
-    result.append(f"Last Updated: {user_data['last_updated']}")
+    for day, counts in summary["days"].items():
+        result.append(f"{day.replace('_', ' ').title()}: {counts['completed']} completed, {counts['stuck']} currently on this day")
     result.append("")
     
-    for day in [1, 2, 3]:
-        result.append(f"Day {day}:")
-        day_tasks = [tid for tid, info in CHECKLIST.items() if info["day"] == day]
-        for task_id in day_tasks:
-            status = "✓" if task_id in completed else "☐"
-            result.append(f"  {status} {task_id}. {CHECKLIST[task_id]['task']}")
-        result.append("")
+    result.append("Completions per task:")
+    for task in summary["tasks"]:
+        result.append(f"  {task['id']}. {task['task']} (day {task['day']}): {task['completed']}")
+    result.append("")
+    
+    result.append("Users by completed tasks:")
+    for count, users in summary["progress"].items():
+        result.append(f"  {count}/{len(summary['tasks'])}: {users}")
+    result.append("")
     
-    total_completed = len(completed)
-    total_tasks = len(CHECKLIST)
-    result.append(f"Progress: {total_completed}/{total_tasks} tasks completed")
+    result.append("New users by week:")
+    for week, users in summary["created_by_week"].items():
+        result.append(f"  {week}: {users}")
     
     return "\n".join(result)
 
 
-def format_all_users_progress(data: dict) -> str:
+def format_all_users_progress(data: dict, checklists: ChecklistSet) -> str:
     """Formats progress for all users."""
     if not data:
         return "No users found in the system."
@@ -111,91 +67,259 @@ def format_all_users_progress(data: dict) -> str:
     result = ["All Users Onboarding Progress", "=" * 50, ""]
     
     for email, user_data in data.items():
-        completed = len(user_data["completed_tasks"])
-        total = len(CHECKLIST)
+        layout = checklists.for_user(email)
+        completed = layout.completed_count(user_data)
+        total = layout.total_tasks
         percentage = (completed / total * 100) if total > 0 else 0
         
         result.append(f"User: {email}")
+        result.append(f"  Checklist: {layout.name}")
         result.append(f"  Progress: {completed}/{total} tasks ({percentage:.1f}%)")
-        result.append(f"  Started: {user_data['created_at']}")
-        result.append(f"  Last Updated: {user_data['last_updated']}")
-        result.append(f"  Completed Tasks: {sorted(user_data['completed_tasks'])}")
+        result.append(f"  Started: {user_data.created_at}")
+        result.append(f"  Last Updated: {user_data.last_updated}")
+        result.append(f"  Completed Tasks: {user_data.completed_tasks}")
         result.append("")
     
     return "\n".join(result)
 
 
+def format_bulk_results(results: list) -> str:
+    """Formats per-item results of a bulk completion."""
+    completed = sum(1 for r in results if r["success"] and not r["was_already_completed"])
+    already = sum(1 for r in results if r["success"] and r["was_already_completed"])
+    failed = len(results) - completed - already
+    
+    result = [f"Bulk completion: {completed} completed, {already} already completed, {failed} failed", ""]
+    for r in results:
+        if not r["success"]:
+            result.append(f"✗ {r['email']} task {r['task_id']}: {r['error']}")
+        elif r["was_already_completed"]:
+            result.append(f"= {r['email']} task {r['task_id']}: already completed ({r['progress_percentage']}%)")
+        else:
+            result.append(f"✓ {r['email']} task {r['task_id']}: completed ({r['progress_percentage']}%)")
+    
+    return "\n".join(result)
+
+
+def format_bulk_progress(users: dict) -> str:
+    """Formats progress summaries of several users."""
+    result = [f"Progress of {len(users)} users", ""]
+    for email, summary in users.items():
+        status = "" if summary["exists"] else " (not started)"
+        result.append(
+            f"{email}{status}: {summary['completed_count']}/{summary['total_tasks']} tasks "
+            f"({summary['progress_percentage']}%), checklist {summary['checklist']}, "
+            f"completed {summary['completed_tasks']}"
+        )
+    
+    return "\n".join(result)
+
+
 # Create MCP server
 app = Server("onboarding-checklist")
 
-
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List of available tools."""
-    return [
-        Tool(
-            name="get_user_progress",
-            description="Get the onboarding checklist progress for a specific user by email. Creates a new user if email doesn't exist.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "email": {
-                        "type": "string",
-                        "description": "User's email address"
-                    }
+# Limits tool calls running at once across all sessions (None = unlimited);
+# set by limit_tool_calls() from --max-concurrency / MCP_MAX_CONCURRENCY
+tool_slots: Optional[asyncio.Semaphore] = None
+max_concurrency = 0
+
+
+def limit_tool_calls(limit: int) -> None:
+    """Lets at most limit tool calls run at once (0 = unlimited); the rest wait."""
+    global tool_slots, max_concurrency
+    tool_slots = asyncio.Semaphore(limit) if limit else None
+    max_concurrency = limit
+
+
+# Seconds after the first tools/list before the user data is loaded in the
+# background (the client is then busy choosing a tool), leaving time to send
+# the listing first. None = load on first use (--no-preload / MCP_PRELOAD=0)
+PRELOAD_DELAY = 0.05
+preload_delay: Optional[float] = PRELOAD_DELAY
+
+
+# Tool definitions, built once at import and returned to every session
+TOOLS = [
+    Tool(
+        name="get_user_progress",
+        description="Get the onboarding checklist progress for a specific user by email. Unknown emails show zero progress.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "email": {
+                    "type": "string",
+                    "description": "User's email address"
+                }
+            },
+            "required": ["email"]
+        }
+    ),
+    Tool(
+        name="mark_task_complete",
+        description="Mark a specific task as completed for a user. Task IDs come from the user's checklist (see get_user_progress). Creates the user if email doesn't exist yet.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "email": {
+                    "type": "string",
+                    "description": "User's email address"
                 },
-                "required": ["email"]
-            }
-        ),
-        Tool(
-            name="mark_task_complete",
-            description="Mark a specific task as completed for a user. Task IDs are 1-9. Creates a new user if email doesn't exist.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "email": {
-                        "type": "string",
-                        "description": "User's email address"
+                "task_id": {
+                    "type": "integer",
+                    "description": "Task ID to mark as complete",
+                    "minimum": 1
+                }
+            },
+            "required": ["email", "task_id"]
+        }
+    ),
+    Tool(
+        name="mark_tasks_complete_bulk",
+        description=f"Mark many tasks as completed at once (up to {bulk.MAX_BULK_ITEMS} items), e.g. for a sync from an HR system. All valid items are saved together; each item gets its own result.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "description": "Completions to record",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "email": {"type": "string"},
+                            "task_id": {"type": "integer", "minimum": 1}
+                        },
+                        "required": ["email", "task_id"]
                     },
-                    "task_id": {
-                        "type": "integer",
-                        "description": "Task ID to mark as complete (1-9)",
-                        "minimum": 1,
-                        "maximum": 9
-                    }
+                    "minItems": 1,
+                    "maxItems": bulk.MAX_BULK_ITEMS
+                }
+            },
+            "required": ["items"]
+        }
+    ),
+    Tool(
+        name="get_users_progress_bulk",
+        description=f"Get a progress summary for many users at once (up to {bulk.MAX_BULK_ITEMS} emails). Unknown emails show zero progress.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "emails": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "minItems": 1,
+                    "maxItems": bulk.MAX_BULK_ITEMS
+                }
+            },
+            "required": ["emails"]
+        }
+    ),
+    Tool(
+        name="get_all_users_progress",
+        description="Get onboarding progress for all users. Only accessible by mentor emails configured in config.json.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "mentor_email": {
+                    "type": "string",
+                    "description": "Mentor's email address"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of users to return",
+                    "minimum": 1
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Cursor from the previous page to continue from"
+                },
+                "min_progress": {
+                    "type": "number",
+                    "description": "Only users with at least this completion percentage"
                 },
-                "required": ["email", "task_id"]
-            }
-        ),
-        Tool(
-            name="get_all_users_progress",
-            description="Get onboarding progress for all users. Only accessible by mentor emails configured in config.json.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "mentor_email": {
-                        "type": "string",
-                        "description": "Mentor's email address"
-                    }
+                "max_progress": {
+                    "type": "number",
+                    "description": "Only users with at most this completion percentage"
                 },
-                "required": ["mentor_email"]
-            }
-        ),
-    ]
+                "incomplete_day": {
+                    "type": "integer",
+                    "description": "Only users with open tasks on this day"
+                },
+                "sort": {
+                    "type": "string",
+                    "enum": list(reports.SORT_KEYS),
+                    "description": "Sort order of the report (default: email)"
+                },
+                "order": {
+                    "type": "string",
+                    "enum": ["asc", "desc"]
+                }
+            },
+            "required": ["mentor_email"]
+        }
+    ),
+    Tool(
+        name="get_cohort_summary",
+        description="Get cohort counters: how many users completed each task and day, how many are currently on each day, and users by progress and start week. Only accessible by mentor emails configured in config.json.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "mentor_email": {
+                    "type": "string",
+                    "description": "Mentor's email address"
+                },
+                "checklist": {
+                    "type": "string",
+                    "description": "Checklist name (default checklist if omitted)"
+                }
+            },
+            "required": ["mentor_email"]
+        }
+    ),
+]
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List of available tools; the first listing also starts loading the user data."""
+    if preload_delay is not None:
+        core.preload(preload_delay)
+    return TOOLS
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
-    """Handle tool calls."""
+    """Handle tool calls; beyond the concurrency limit they wait for a free slot."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with metrics.MCP_IN_FLIGHT.labels().track_inprogress():
+            if tool_slots is None:
+                result = await run_tool(name, arguments)
+            else:
+                async with tool_slots:
+                    result = await run_tool(name, arguments)
+        text = result[0].text if result else ""
+        if text.startswith("Error: Unknown tool"):
+            name = "unknown"
+        elif not text.startswith("Error"):
+            outcome = "ok"
+        return result
+    finally:
+        metrics.MCP_TOOL_SECONDS.labels(name, outcome).observe(time.perf_counter() - started)
+
+
+async def run_tool(name: str, arguments: Any) -> list[TextContent]:
+    """Runs one tool call."""
     
     if name == "get_user_progress":
         email = arguments.get("email")
         if not email:
             return [TextContent(type="text", text="Error: email is required")]
         
-        data = load_user_data()
-        user_data = get_user(email, data)
-        progress = format_progress(email, user_data)
+        layout = (await core.current_checklists()).for_user(email)
+        async with core.user_locks.hold(email):
+            user_data, saved = await core.get_user(email)
+        progress = format_progress(email, user_data, layout, cached=saved)
         
         return [TextContent(type="text", text=progress)]
     
@@ -207,68 +331,224 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
             return [TextContent(type="text", text="Error: email is required")]
         if task_id is None:
             return [TextContent(type="text", text="Error: task_id is required")]
+        if not is_task_id(task_id):
+            return [TextContent(type="text", text=f"Error: task_id must be an integer, got {task_id!r}")]
         
-        # Validate task_id
-        if task_id not in CHECKLIST:
+        # Validate task_id against the user's checklist
+        layout = (await core.current_checklists()).for_user(email)
+        if task_id not in layout.tasks:
             return [TextContent(
                 type="text",
-                text=f"Error: Invalid task_id. Must be between 1 and 9."
+                text=f"Error: Invalid task_id. Must be {layout.valid_ids}."
             )]
         
-        # Load data
-        data = load_user_data()
-        user_data = get_user(email, data)
-        
-        # Add task if not already completed
-        if task_id not in user_data["completed_tasks"]:
-            user_data["completed_tasks"].append(task_id)
-            user_data["completed_tasks"].sort()
-            user_data["last_updated"] = datetime.now().isoformat()
-            save_user_data(data)
+        # Add task if not already completed (creates the user if needed)
+        async with core.user_locks.hold(email):
+            user_data, was_completed = await core.store.complete_task(email, task_id)
+        if not was_completed:
             message = f"Task {task_id} marked as completed for {email}"
         else:
             message = f"Task {task_id} was already completed for {email}"
         
         # Return updated progress
-        progress = format_progress(email, user_data)
+        progress = format_progress(email, user_data, layout)
         return [TextContent(type="text", text=f"{message}\n\n{progress}")]
     
+    elif name == "mark_tasks_complete_bulk":
+        items = arguments.get("items")
+        if not items:
+            return [TextContent(type="text", text="Error: items is required")]
+        if len(items) > bulk.MAX_BULK_ITEMS:
+            return [TextContent(type="text", text=f"Error: at most {bulk.MAX_BULK_ITEMS} items per call")]
+        if any(not item.get("email") or not is_task_id(item.get("task_id")) for item in items):
+            return [TextContent(type="text", text="Error: every item needs an email and an integer task_id")]
+        
+        results = await bulk.complete_tasks(
+            core.store, await core.current_checklists(), [(item["email"], item["task_id"]) for item in items]
+        )
+        return [TextContent(type="text", text=format_bulk_results(results))]
+    
+    elif name == "get_users_progress_bulk":
+        emails = arguments.get("emails")
+        if not emails:
+            return [TextContent(type="text", text="Error: emails is required")]
+        if len(emails) > bulk.MAX_BULK_ITEMS:
+            return [TextContent(type="text", text=f"Error: at most {bulk.MAX_BULK_ITEMS} emails per call")]
+        
+        users = await bulk.get_progress(
+            core.store, await core.current_checklists(), emails, create_missing=core.create_users_on_read
+        )
+        return [TextContent(type="text", text=format_bulk_progress(users))]
+    
     elif name == "get_all_users_progress":
         mentor_email = arguments.get("mentor_email")
         if not mentor_email:
             return [TextContent(type="text", text="Error: mentor_email is required")]
         
         # Check if email is a mentor
-        config = load_config()
-        mentors = config.get("mentors", [])
-        
-        if mentor_email not in mentors:
+        if not await core.is_mentor(mentor_email):
             return [TextContent(
                 type="text",
                 text=f"Error: Access denied. {mentor_email} is not authorized as a mentor."
             )]
         
-        # Load and format all users data
-        data = load_user_data()
-        all_progress = format_all_users_progress(data)
+        # Filter, sort and format one page of users (all users if no limit)
+        checklists = await core.current_checklists()
+        matches = reports.make_filter(
+            checklists,
+            min_progress=arguments.get("min_progress"),
+            max_progress=arguments.get("max_progress"),
+            incomplete_day=arguments.get("incomplete_day")
+        )
+        try:
+            page, next_cursor = await core.store.run(partial(
+                reports.query_users, core.store.storage, checklists, matches,
+                sort=arguments.get("sort", "email"),
+                descending=arguments.get("order") == "desc",
+                cursor=arguments.get("cursor"),
+                limit=arguments.get("limit")
+            ))
+        except ValueError as exc:
+            return [TextContent(type="text", text=f"Error: {exc}")]
+        all_progress = format_all_users_progress(dict(page), checklists)
+        if next_cursor:
+            all_progress += f"\nMore users available: call again with cursor=\"{next_cursor}\""
         
         return [TextContent(type="text", text=all_progress)]
     
+    elif name == "get_cohort_summary":
+        mentor_email = arguments.get("mentor_email")
+        if not mentor_email:
+            return [TextContent(type="text", text="Error: mentor_email is required")]
+        
+        if not await core.is_mentor(mentor_email):
+            return [TextContent(
+                type="text",
+                text=f"Error: Access denied. {mentor_email} is not authorized as a mentor."
+            )]
+        
+        await core.current_checklists()
+        try:
+            summary = await core.store.cohort_summary(arguments.get("checklist"))
+        except KeyError:
+            return [TextContent(type="text", text=f"Error: Unknown checklist {arguments.get('checklist')}")]
+        return [TextContent(type="text", text=format_cohort_summary(summary))]
+    
     else:
         return [TextContent(type="text", text=f"Error: Unknown tool {name}")]
 
 
-async def main():
-    """Start MCP server."""
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+def mcp_http_app(max_sessions: Optional[int] = None):
+    """
+    Returns an ASGI app serving this MCP server over the network: streamable
+    HTTP at /mcp and the older SSE transport at /sse (messages posted to
+    /messages/). All sessions run in this process and share its core, so
+    agents reuse the warm store, checklists and caches.
+    """
+    from contextlib import asynccontextmanager
+    from mcp.server.sse import SseServerTransport
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Mount, Route
+
+    # None keeps the SDK's default cap; passing None would lift the cap entirely
+    limits = {"max_sessions": max_sessions} if max_sessions is not None else {}
+    sessions = StreamableHTTPSessionManager(app=app, **limits)
+    sse = SseServerTransport("/messages/")
+
+    class StreamableHTTP:
+        async def __call__(self, scope, receive, send):
+            await sessions.handle_request(scope, receive, send)
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+        return Response()
+
+    async def get_metrics(request):
+        return Response(metrics.REGISTRY.render(), media_type=metrics.Registry.content_type)
+
+    async def health(request):
+        return JSONResponse({"status": "healthy", "max_concurrency": max_concurrency})
+
+    @asynccontextmanager
+    async def lifespan(_):
+        async with sessions.run():
+            yield
+
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=StreamableHTTP()),
+            Route("/sse", endpoint=handle_sse),
+            Mount("/messages/", app=sse.handle_post_message),
+            Route("/health", endpoint=health),
+            Route("/metrics", endpoint=get_metrics),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def uvicorn_server(asgi_app, host: str, port: int, stdio: bool = False):
+    """
+    Returns a uvicorn server for asgi_app. With stdio=True the access log is
+    off and uvicorn's logging config (which writes to stdout) is not
+    installed, since stdout carries the MCP protocol.
+    """
+    import uvicorn
+
+    if stdio:
+        return uvicorn.Server(uvicorn.Config(asgi_app, host=host, port=port, access_log=False, log_config=None))
+    return uvicorn.Server(uvicorn.Config(asgi_app, host=host, port=port))
+
+
+async def main(transport: str = "stdio", host: str = "0.0.0.0", port: int = 8001,
+               http_port: Optional[int] = None, max_sessions: Optional[int] = None):
+    """
+    Start MCP server over stdio or the network ("http"), and the HTTP API on
+    http_port in the same event loop if given.
+    """
+    servers = []
+    if http_port:
+        from http_server import app as http_app
+        servers.append(uvicorn_server(http_app, host, http_port, stdio=transport == "stdio"))
+    if transport == "http":
+        servers.append(uvicorn_server(mcp_http_app(max_sessions), host, port))
+    tasks = [asyncio.create_task(server.serve()) for server in servers]
+    try:
+        if transport == "stdio":
+            async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+                await app.run(
+                    read_stream,
+                    write_stream,
+                    app.create_initialization_options()
+                )
+        else:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for server in servers:
+            server.should_exit = True
+        await asyncio.gather(*tasks)
+        core.close()
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
-
+    parser = argparse.ArgumentParser(description="Onboarding checklist MCP server.")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                        help="stdio (one process per client) or http (streamable HTTP at /mcp and SSE at /sse)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001, help="port of the http transport")
+    parser.add_argument("--http-port", type=int,
+                        help="also serve the HTTP API on this port, from the same process and store")
+    parser.add_argument("--max-concurrency", type=int, default=int(os.environ.get("MCP_MAX_CONCURRENCY", 0)),
+                        help="tool calls running at once across all sessions; 0 = unlimited")
+    parser.add_argument("--max-sessions", type=int, default=None,
+                        help="open streamable HTTP sessions; more get 503 (default: SDK limit)")
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction,
+                        default=os.environ.get("MCP_PRELOAD", "1").lower() not in ("0", "false", "no"),
+                        help="load user data in the background after the first tools/list (default: on)")
+    args = parser.parse_args()
+    limit_tool_calls(args.max_concurrency)
+    if not args.preload:
+        preload_delay = None
+    asyncio.run(main(args.transport, args.host, args.port, args.http_port, args.max_sessions))
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Sharded storage: users partitioned across several stores by email hash.
+
+With "storage": {"shards": N} in config.json (or STORAGE_SHARDS=N), users
+live in N independent stores of the configured backend, each with its own
+files and locks: data.json becomes data.shard-0-of-N.json ...
+data.shard-<N-1>-of-N.json (data.db likewise). A user's shard is a stable
+hash of their email (CRC-32, the same in every process and on every
+machine), so:
+- reads and writes of one user touch one shard only: one lock, one
+  journal, one snapshot a N-th of the size to compact;
+- writes to different shards proceed in parallel, in one process (storage
+  threads) and across processes (workers, the MCP server);
+- whole-cohort queries (mentor reports, counts, cohort summary) fan out to
+  every shard concurrently and merge the results: reports in email order,
+  summaries by adding up counters.
+
+A batch of mutations is one durable write per shard it touches; if one
+shard fails, the others' part of the batch may already be applied.
+
+The number of shards is part of the file names, so a server configured
+with another number than the files on disk refuses to start instead of
+losing users. reshard.py moves users between layouts (1 shard = the
+unsharded data.json).
+"""
+
+import glob
+import heapq
+import os
+import re
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import aggregates
+from store import DEFAULT_GROUP_COMMIT_MAX, JsonStore, Storage, UserRecord, check_mutation
+
+
+def shard_of(email: str, count: int) -> int:
+    """Returns the shard (0 .. count-1) a user lives in."""
+    return zlib.crc32(email.encode("utf-8")) % count
+
+
+def shard_paths(path: str, count: int) -> List[str]:
+    """Returns the file of every shard of a layout; a single shard is the path itself."""
+    if count == 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}.shard-{n}-of-{count}{ext}" for n in range(count)]
+
+
+def has_data(path: str) -> bool:
+    """Whether a store has files on disk (a JSON store may only have a journal yet)."""
+    return os.path.exists(path) or os.path.exists(f"{path}.journal")
+
+
+def find_layouts(path: str) -> List[int]:
+    """Returns the shard counts of the layouts found on disk for a path, smallest first."""
+    root, ext = os.path.splitext(path)
+    pattern = re.compile(re.escape(f"{root}.shard-") + r"\d+-of-(\d+)" + re.escape(ext) + r"(\.journal)?$")
+    counts = {int(match.group(1)) for match in map(pattern.match, glob.glob(f"{glob.escape(root)}.shard-*"))
+              if match}
+    if has_data(path):
+        counts.add(1)
+    return sorted(counts)
+
+
+def check_layout(path: str, count: int) -> None:
+    """Raises ValueError if the files on disk belong to another number of shards."""
+    if any(has_data(shard_path) for shard_path in shard_paths(path, count)):
+        return
+    layouts = find_layouts(path)
+    if layouts:
+        raise ValueError(
+            f"{path}: configured for {count} shard(s), but the data on disk has {layouts[0]}; "
+            f"run `python reshard.py --shards {count}` or set STORAGE_SHARDS={layouts[0]}"
+        )
+
+
+def open_backend(backend: str, path: str) -> Storage:
+    """Opens one unsharded store of a backend."""
+    if backend == "json":
+        return JsonStore(path)
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(path)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def open_layout(backend: str, path: str, count: int) -> Storage:
+    """Opens the stores of a layout: the plain backend for one shard, a ShardedStore otherwise."""
+    check_layout(path, count)
+    if count == 1:
+        return open_backend(backend, path)
+    return ShardedStore([open_backend(backend, shard_path) for shard_path in shard_paths(path, count)])
+
+
+def write_shards(backend: str, path: str, count: int, users: Dict[str, UserRecord]) -> List[int]:
+    """Writes {email: record} to the (new) files of a layout; returns the number of users per shard."""
+    parts: List[Dict[str, UserRecord]] = [{} for _ in range(count)]
+    for email, user in users.items():
+        parts[shard_of(email, count)][email] = user
+    for shard_path, part in zip(shard_paths(path, count), parts):
+        store = open_backend(backend, shard_path)
+        if isinstance(store, JsonStore):
+            store.save(part)
+        else:
+            store.import_users(part)
+        store.close()
+    return [len(part) for part in parts]
+
+
+def merge_rows(lists: Iterable[Iterable[Tuple[str, UserRecord]]]) -> Iterator[Tuple[str, UserRecord]]:
+    """Merges (email, record) sequences that are each ordered by email."""
+    # No key function needed (and faster without): an email is in one shard
+    # only, so comparing two pairs never gets to the records
+    return heapq.merge(*lists)
+
+
+class ShardedStore(Storage):
+    """A Storage over several stores, each holding the users whose email hashes to it."""
+
+    def __init__(self, shards: List[Storage]):
+        self.shards = shards
+        # Fan-out of whole-cohort queries: one thread per shard
+        self._executor = ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="shard")
+
+    def shard_for(self, email: str) -> Storage:
+        return self.shards[shard_of(email, len(self.shards))]
+
+    def _each(self, fn: Callable[[Storage], object]) -> list:
+        """Calls fn on every shard concurrently; returns the results in shard order."""
+        return list(self._executor.map(fn, self.shards))
+
+    def _by_shard(self, emails: Iterable[str]) -> Dict[int, List[Tuple[int, str]]]:
+        """Groups (position, email) pairs by shard."""
+        groups: Dict[int, List[Tuple[int, str]]] = {}
+        count = len(self.shards)
+        for position, email in enumerate(emails):
+            groups.setdefault(shard_of(email, count), []).append((position, email))
+        return groups
+
+    # Single users: one shard
+
+    def get_user(self, email: str) -> Optional[UserRecord]:
+        return self.shard_for(email).get_user(email)
+
+    def get_users(self, emails: Iterable[str]) -> dict:
+        groups = self._by_shard(emails)
+        if len(groups) == 1:
+            (shard, items), = groups.items()
+            return self.shards[shard].get_users([email for _, email in items])
+        users = {}
+        parts = self._executor.map(
+            lambda group: self.shards[group[0]].get_users([email for _, email in group[1]]), groups.items()
+        )
+        for part in parts:
+            users.update(part)
+        return users
+
+    def apply_mutations(self, mutations: List[tuple]) -> List[Tuple[UserRecord, bool]]:
+        # Validate up front so a bad mutation can't leave other shards half-applied
+        for mutation in mutations:
+            check_mutation(mutation)
+        groups = self._by_shard(email for _, email, _ in mutations)
+        if len(groups) == 1:
+            (shard, _), = groups.items()
+            return self.shards[shard].apply_mutations(mutations)
+        results: list = [None] * len(mutations)
+
+        def apply(group):
+            shard, items = group
+            applied = self.shards[shard].apply_mutations([mutations[position] for position, _ in items])
+            for (position, _), result in zip(items, applied):
+                results[position] = result
+
+        list(self._executor.map(apply, groups.items()))
+        return results
+
+    @property
+    def queues_mutations(self) -> bool:
+        return any(shard.queues_mutations for shard in self.shards)
+
+    def enable_group_commit(self, window_ms: float, max_batch: int = DEFAULT_GROUP_COMMIT_MAX) -> None:
+        """One GroupCommitter per shard, so shards commit in parallel."""
+        for shard in self.shards:
+            shard.enable_group_commit(window_ms, max_batch)
+
+    def submit(self, mutation: tuple) -> Future:
+        try:
+            check_mutation(mutation)
+        except ValueError as exc:
+            future = Future()
+            future.set_exception(exc)
+            return future
+        return self.shard_for(mutation[1]).submit(mutation)
+
+    # Whole cohort: every shard, concurrently
+
+    def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, UserRecord]]:
+        parts = self._each(lambda shard: shard.list_users(after, limit))
+        return list(islice(merge_rows(parts), limit))
+
+    def iter_users(self, after: Optional[str] = None, batch_size: int = 1000) -> Iterator[Tuple[str, UserRecord]]:
+        # Shards that need to re-read their files do so in parallel first
+        self._each(lambda shard: shard.refresh())
+        return merge_rows([shard.iter_users(after, batch_size) for shard in self.shards])
+
+    def count_users(self) -> int:
+        return sum(self._each(lambda shard: shard.count_users()))
+
+    def load(self) -> dict:
+        users = {}
+        for part in self._each(lambda shard: shard.load()):
+            users.update(part)
+        return users
+
+    def refresh(self) -> None:
+        self._each(lambda shard: shard.refresh())
+
+    def attach_index(self, index) -> None:
+        """Gives every shard its own CohortIndex over the same checklists; summaries are added up."""
+        self.index = index
+        self._each(lambda shard: shard.attach_index(aggregates.CohortIndex(index.checklists)))
+
+    def cohort_summary(self, checklist: Optional[str] = None) -> dict:
+        return aggregates.merge_summaries(self._each(lambda shard: shard.cohort_summary(checklist)))
+
+    def attach_feed(self, feed) -> None:
+        self.feed = feed
+        for shard in self.shards:
+            shard.attach_feed(feed)
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown(wait=True)
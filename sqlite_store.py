@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+SQLite storage backend.
+
+Schema:
+- users(email PRIMARY KEY, created_at, last_updated, completed_mask),
+  indexed on last_updated; completed_mask has bit N set for completed task N;
+- completions(email, task_id, completed_at), primary key (email, task_id).
+
+Per-user reads and writes are index lookups, so they stay O(log N) as the
+number of users grows, and list_users() pages through the email index.
+Reads only touch the users table; completions keeps when each task was done.
+Databases created before completed_mask existed get the column on open.
+The database runs in WAL mode; several processes can share it safely.
+
+Every write transaction bumps meta.version. An attached CohortIndex is
+updated in place for this process's own writes and rebuilt when the
+version shows that another process changed the database.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+import metrics
+from store import Storage, UserRecord, check_mutation, task_mask
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    completed_mask INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_users_last_updated ON users(last_updated);
+CREATE TABLE IF NOT EXISTS completions (
+    email TEXT NOT NULL REFERENCES users(email),
+    task_id INTEGER NOT NULL,
+    completed_at TEXT NOT NULL,
+    PRIMARY KEY (email, task_id)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+
+class SqliteStore(Storage):
+    """Storage backend on a SQLite database file, one connection per thread."""
+
+    def __init__(self, filepath: str, busy_timeout: float = 30.0):
+        self.filepath = filepath
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._index_lock = threading.RLock()
+        self._index_version: Optional[int] = None
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self._add_mask_column()
+
+    def _add_mask_column(self) -> None:
+        """Adds and backfills users.completed_mask in databases that predate it."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+            if "completed_mask" not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN completed_mask INTEGER NOT NULL DEFAULT 0")
+                tasks = {}
+                for email, task_id in conn.execute("SELECT email, task_id FROM completions"):
+                    tasks.setdefault(email, []).append(task_id)
+                conn.executemany(
+                    "UPDATE users SET completed_mask = ? WHERE email = ?",
+                    [(task_mask(task_ids), email) for email, task_ids in tasks.items()]
+                )
+                self._bump_version(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.filepath, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def get_user(self, email: str) -> Optional[UserRecord]:
+        with metrics.STORAGE_LOAD.time():
+            return self._read_user(email)
+
+    def _read_user(self, email: str) -> Optional[UserRecord]:
+        row = self._connect().execute(
+            "SELECT created_at, last_updated, completed_mask FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        if row is None:
+            return None
+        return UserRecord(*row)
+
+    def get_users(self, emails: Iterable[str]) -> dict:
+        with metrics.STORAGE_LOAD.time():
+            return self._read_users(emails)
+
+    def _read_users(self, emails: Iterable[str]) -> dict:
+        conn = self._connect()
+        emails = list(dict.fromkeys(emails))
+        users = {}
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(emails), 500):
+            chunk = emails[start:start + 500]
+            rows = conn.execute(
+                "SELECT email, created_at, last_updated, completed_mask FROM users "
+                f"WHERE email IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            users.update((email, UserRecord(*fields)) for email, *fields in rows)
+        return users
+
+    def _version(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _bump_version(self, conn: sqlite3.Connection) -> int:
+        """Marks a write inside the current transaction; returns the previous version."""
+        version = self._version(conn)
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (version + 1,))
+        return version
+
+    def apply_mutations(self, mutations: List[tuple]) -> List[Tuple[UserRecord, bool]]:
+        for mutation in mutations:
+            check_mutation(mutation)
+        # The index lock keeps index updates in commit order
+        with self._index_lock, metrics.STORAGE_SAVE.time():
+            return self._apply_mutations(mutations)
+
+    def _apply_mutations(self, mutations: List[tuple]) -> List[Tuple[UserRecord, bool]]:
+        conn = self._connect()
+        now = datetime.now().isoformat()
+        results, changes = [], []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._bump_version(conn)
+            for op, email, task_id in mutations:
+                before = self._read_user(email) if self.index is not None or self.feed is not None else None
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO users (email, created_at, last_updated) VALUES (?, ?, ?)",
+                    (email, now, now)
+                ).rowcount
+                if op == "complete":
+                    inserted = conn.execute(
+                        "INSERT OR IGNORE INTO completions (email, task_id, completed_at) VALUES (?, ?, ?)",
+                        (email, task_id, now)
+                    ).rowcount
+                    if inserted:
+                        conn.execute(
+                            "UPDATE users SET last_updated = ?, completed_mask = completed_mask | ? WHERE email = ?",
+                            (now, 1 << task_id, email)
+                        )
+                after = self._read_user(email)
+                results.append((after, not inserted))
+                if inserted:
+                    changes.append((email, before, after))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if self.index is not None:
+            if self._index_version == version:
+                for email, before, after in changes:
+                    self.index.on_change(email, before, after)
+                self._index_version = version + 1
+            else:
+                self._index_version = None
+        if self.feed is not None:
+            for email, before, after in changes:
+                self.feed.on_change(email, before, after)
+        return results
+
+    def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, UserRecord]]:
+        rows = self._connect().execute(
+            "SELECT email, created_at, last_updated, completed_mask FROM users "
+            "WHERE email > ? ORDER BY email LIMIT ?",
+            (after if after is not None else "", limit if limit is not None else -1)
+        )
+        return [(email, UserRecord(*fields)) for email, *fields in rows]
+
+    def count_users(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def attach_index(self, index) -> None:
+        # Built on first use by cohort_summary, like a stale index
+        with self._index_lock:
+            self.index = index
+            self._index_version = None
+
+    def _rebuild_index(self) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            version = self._version(conn)
+            self.index.rebuild(self.iter_users())
+        finally:
+            conn.execute("COMMIT")
+        self._index_version = version
+
+    def cohort_summary(self, checklist: Optional[str] = None) -> dict:
+        with self._index_lock:
+            if self._index_version != self._version(self._connect()):
+                self._rebuild_index()
+            return self.index.summary(checklist)
+
+    def import_users(self, data: dict) -> int:
+        """
+        Merges {email: UserRecord} data (as loaded by JsonStore) in one transaction.
+        Completed tasks are unioned; the earliest created_at and latest
+        last_updated win. Returns the number of users imported.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._bump_version(conn)
+            for email, user in data.items():
+                conn.execute(
+                    "INSERT INTO users (email, created_at, last_updated, completed_mask) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(email) DO UPDATE SET "
+                    "created_at = MIN(created_at, excluded.created_at), "
+                    "last_updated = MAX(last_updated, excluded.last_updated), "
+                    "completed_mask = completed_mask | excluded.completed_mask",
+                    (email, user.created_at, user.last_updated, user.mask)
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO completions (email, task_id, completed_at) VALUES (?, ?, ?)",
+                    [(email, task_id, user.last_updated) for task_id in user.completed_tasks]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(data)
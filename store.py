@@ -0,0 +1,872 @@
+#!/usr/bin/env python3
+"""
+Shared user data store for the MCP and HTTP servers.
+
+Storage is the interface both servers program against; open_store() picks the
+backend from config.json ("storage": {"backend": ..., "path": ...}) or the
+STORAGE_BACKEND / STORAGE_PATH environment variables:
+- "json" (default): JsonStore below;
+- "sqlite": SqliteStore in sqlite_store.py.
+With "shards": N (or STORAGE_SHARDS) users are spread over N stores of that
+backend by email hash (ShardedStore in sharding.py).
+
+Storage methods do blocking disk I/O. The async servers use them through
+AsyncStore, which runs every call in a bounded thread pool
+("storage": {"io_workers": N} or STORAGE_IO_WORKERS) so a slow write never
+stalls the event loop.
+
+JsonStore keeps user data in two files:
+- the snapshot (data.json), a full copy of all users, rewritten atomically
+  via temp-file-plus-rename only during compaction;
+- the journal (data.json.journal), an append-only log of small per-event
+  records ("create", "complete") written on every mutation.
+
+Loading reads the snapshot and replays the journal on top of it. The parsed
+result is kept in memory as UserRecord objects (completed tasks as a bitmask)
+and re-read only when either file changes on disk. Nothing is read before
+the first access, so opening a store (and starting a server) stays cheap.
+
+Several processes (uvicorn workers, the MCP server next to the HTTP server)
+may share the same files: every read and mutation holds an advisory flock on
+data.json.lock, so appends and compactions never interleave.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single process only
+    fcntl = None
+
+DEFAULT_COMPACT_EVERY = 1000
+DEFAULT_IO_WORKERS = 8
+DEFAULT_GROUP_COMMIT_MS = 0
+DEFAULT_GROUP_COMMIT_MAX = 256
+
+
+def load_json_file(filepath: str) -> dict:
+    """Loads data from JSON file."""
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def load_snapshot(filepath: str) -> dict:
+    """
+    Loads a data snapshot; a missing file is empty. Unlike load_json_file, an
+    unreadable or corrupt file raises (ValueError / OSError): taken as empty,
+    the next compaction would overwrite every user with nothing.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"{filepath}: corrupt snapshot ({exc}); restore it from a backup") from exc
+    if not isinstance(data, dict):
+        raise ValueError(f"{filepath}: corrupt snapshot (expected an object of users)")
+    return data
+
+
+def save_json_file(filepath: str, data: dict) -> None:
+    """Saves data to JSON file atomically (temp file, fsync, rename)."""
+    tmp_path = f"{filepath}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.replace(tmp_path, filepath)
+    except OSError as exc:
+        # E.g. a single-file bind mount, which can't be renamed over. Rewriting
+        # it in place could leave a truncated snapshot behind on a crash.
+        os.unlink(tmp_path)
+        raise OSError(
+            f"{filepath}: cannot replace the snapshot atomically ({exc}); keep data files in a "
+            f"mounted directory (e.g. STORAGE_PATH=/app/data/data.json), not a mounted file"
+        ) from exc
+    _fsync_dir(os.path.dirname(os.path.abspath(filepath)))
+
+
+def _fsync_dir(dirpath: str) -> None:
+    """Makes a rename inside dirpath durable."""
+    try:
+        fd = os.open(dirpath, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def file_signature(filepath: str) -> Optional[Tuple[int, int, int]]:
+    """Returns (inode, mtime_ns, size) of a file, or None if it is missing."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# Completed tasks are stored as a bitmask that must fit a signed 64-bit integer
+MAX_TASK_ID = 62
+
+
+if hasattr(int, "bit_count"):
+    def popcount(mask: int) -> int:
+        """Returns the number of set bits."""
+        return mask.bit_count()
+else:  # Python < 3.10
+    def popcount(mask: int) -> int:
+        """Returns the number of set bits."""
+        return bin(mask).count("1")
+
+
+def check_mutation(mutation: tuple) -> None:
+    """Raises ValueError unless mutation is a well-formed (op, email, task_id) tuple."""
+    if not isinstance(mutation, tuple) or len(mutation) != 3:
+        raise ValueError(f"mutation must be an (op, email, task_id) tuple, got {mutation!r}")
+    op, email, task_id = mutation
+    if op not in ("create", "complete"):
+        raise ValueError(f"unknown mutation {op!r}")
+    if not isinstance(email, str) or not email:
+        raise ValueError(f"email must be a non-empty string, got {email!r}")
+    if op == "complete" and (
+        not isinstance(task_id, int) or isinstance(task_id, bool) or not 0 <= task_id <= MAX_TASK_ID
+    ):
+        raise ValueError(f"task id must be an integer from 0 to {MAX_TASK_ID}, got {task_id!r}")
+
+
+def task_mask(task_ids: Iterable[int]) -> int:
+    """Returns the bitmask with bit N set for every task id N."""
+    mask = 0
+    for task_id in task_ids:
+        mask |= 1 << task_id
+    return mask
+
+
+def mask_tasks(mask: int) -> List[int]:
+    """Returns the task ids whose bits are set, in ascending order."""
+    task_id, tasks = 0, []
+    while mask:
+        if mask & 1:
+            tasks.append(task_id)
+        mask >>= 1
+        task_id += 1
+    return tasks
+
+
+class UserRecord:
+    """
+    One user's progress. Completed tasks are an integer bitmask (bit N set =
+    task N completed), so counts are popcounts and per-day checks are ANDs.
+    """
+
+    __slots__ = ("mask", "created_at", "last_updated")
+
+    def __init__(self, created_at: str, last_updated: Optional[str] = None, mask: int = 0):
+        self.mask = mask
+        self.created_at = created_at
+        self.last_updated = last_updated or created_at
+
+    @property
+    def completed_tasks(self) -> List[int]:
+        """Completed task ids in ascending order."""
+        return mask_tasks(self.mask)
+
+    @property
+    def completed_count(self) -> int:
+        return popcount(self.mask)
+
+    def has(self, task_id: int) -> bool:
+        """Returns whether a task is completed."""
+        return bool(self.mask >> task_id & 1)
+
+    def copy(self) -> "UserRecord":
+        return UserRecord(self.created_at, self.last_updated, self.mask)
+
+    def to_dict(self) -> dict:
+        """Returns the on-disk form of the record."""
+        return {"completed_mask": self.mask, "created_at": self.created_at, "last_updated": self.last_updated}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserRecord":
+        """Reads a record in the on-disk form, or the older completed_tasks list form."""
+        mask = data.get("completed_mask")
+        if mask is None:
+            mask = task_mask(data.get("completed_tasks", []))
+        return cls(data["created_at"], data.get("last_updated"), mask)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, UserRecord):
+            return NotImplemented
+        return (self.mask, self.created_at, self.last_updated) == (other.mask, other.created_at, other.last_updated)
+
+    def __repr__(self) -> str:
+        return f"UserRecord(completed_tasks={self.completed_tasks}, created_at={self.created_at!r}, last_updated={self.last_updated!r})"
+
+
+def create_new_user(created_at: Optional[str] = None) -> UserRecord:
+    """Creates a new user record with empty progress."""
+    return UserRecord(created_at or datetime.now().isoformat())
+
+
+def apply_record(data: dict, record: dict, on_change=None) -> None:
+    """
+    Applies one journal record to user data.
+    Replaying a record twice is a no-op, so a crash between writing a
+    snapshot and truncating the journal is harmless.
+    If given, on_change(email, before, after) is called when a user changes
+    (before is None for a new user).
+    """
+    email = record["email"]
+    user = data.get(email)
+    before = None
+    if user is None:
+        user = data[email] = create_new_user(record["at"])
+        changed = True
+    else:
+        changed = False
+        if on_change is not None:
+            before = user.copy()
+    if record["op"] == "complete":
+        bit = 1 << record["task_id"]
+        if not user.mask & bit:
+            user.mask |= bit
+            user.last_updated = record["at"]
+            changed = True
+    if changed and on_change is not None:
+        on_change(email, before, user)
+
+
+class Storage:
+    """
+    Interface implemented by every storage backend.
+    Users are UserRecord objects keyed by email.
+
+    Mutations are ("create", email, None) or ("complete", email, task_id)
+    tuples. Backends implement apply_mutations(), which applies a list of them
+    in one durable write; with group commit enabled, concurrent mutations are
+    queued and applied together by a GroupCommitter.
+    """
+
+    group_commit: Optional["GroupCommitter"] = None
+    index = None
+    feed = None
+
+    def get_user(self, email: str) -> Optional[UserRecord]:
+        """Returns a user record, or None if the user doesn't exist."""
+        raise NotImplementedError
+
+    def apply_mutations(self, mutations: List[tuple]) -> List[Tuple[UserRecord, bool]]:
+        """
+        Applies mutations in one durable write.
+        Returns (user record, unchanged) per mutation, where unchanged is True
+        if the user already existed ("create") or the task was already
+        completed ("complete").
+        """
+        raise NotImplementedError
+
+    def get_users(self, emails: Iterable[str]) -> dict:
+        """Returns {email: record} for those of the emails that exist."""
+        users = {}
+        for email in emails:
+            user = self.get_user(email)
+            if user is not None:
+                users[email] = user
+        return users
+
+    def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, UserRecord]]:
+        """Returns (email, record) pairs ordered by email, starting after `after`."""
+        raise NotImplementedError
+
+    def count_users(self) -> int:
+        """Returns the number of users."""
+        raise NotImplementedError
+
+    def iter_users(self, after: Optional[str] = None, batch_size: int = 1000) -> Iterator[Tuple[str, UserRecord]]:
+        """Yields (email, record) pairs ordered by email, fetched in batches."""
+        while True:
+            batch = self.list_users(after=after, limit=batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1][0]
+
+    def load(self) -> dict:
+        """Returns all users as {email: record}."""
+        return dict(self.list_users())
+
+    def attach_index(self, index) -> None:
+        """
+        Keeps an aggregates.CohortIndex up to date with every user change,
+        starting with a rebuild from the current users (on the first
+        cohort_summary in the built-in backends, so attaching is cheap).
+        """
+        raise NotImplementedError
+
+    def cohort_summary(self, checklist: Optional[str] = None) -> dict:
+        """Returns the attached index's counters for a checklist (default one for None)."""
+        raise NotImplementedError
+
+    def attach_feed(self, feed) -> None:
+        """
+        Reports every user change to a changefeed.ChangeFeed as
+        on_change(email, before, after), and calls its reset() when changes
+        can't be reported one by one (e.g. a full reload).
+        """
+        self.feed = feed
+
+    def refresh(self) -> None:
+        """Picks up changes made by other processes; a no-op for backends without an in-memory view."""
+
+    def _notify_change(self, email: str, before: Optional[UserRecord], after: UserRecord) -> None:
+        if self.index is not None:
+            self.index.on_change(email, before, after)
+        if self.feed is not None:
+            self.feed.on_change(email, before, after)
+
+    @property
+    def queues_mutations(self) -> bool:
+        """Whether submit() hands mutations to a background committer."""
+        return self.group_commit is not None
+
+    def enable_group_commit(self, window_ms: float, max_batch: int = DEFAULT_GROUP_COMMIT_MAX) -> None:
+        """Routes mutations through a GroupCommitter."""
+        self.group_commit = GroupCommitter(self.apply_mutations, window_ms / 1000, max_batch)
+
+    def submit(self, mutation: tuple) -> Future:
+        """Queues one mutation; the future resolves once it is durable."""
+        future = Future()
+        try:
+            check_mutation(mutation)
+        except ValueError as exc:
+            future.set_exception(exc)
+            return future
+        if self.group_commit is not None:
+            return self.group_commit.submit(mutation)
+        try:
+            future.set_result(self.apply_mutations([mutation])[0])
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+    def create_user(self, email: str) -> UserRecord:
+        """Creates a user if missing and returns the record."""
+        return self.submit(("create", email, None)).result()[0]
+
+    def complete_task(self, email: str, task_id: int) -> Tuple[UserRecord, bool]:
+        """
+        Marks a task as completed, creating the user if needed.
+        Returns the user record and whether the task was already completed.
+        """
+        return self.submit(("complete", email, task_id)).result()
+
+    def close(self) -> None:
+        """Flushes pending mutations and stops background work."""
+        if self.group_commit is not None:
+            self.group_commit.close()
+
+
+class GroupCommitter:
+    """
+    Batches mutations from concurrent callers into one durable write.
+
+    A writer thread takes the first queued mutation, keeps collecting for
+    `window` seconds (or until `max_batch` mutations), then hands the batch to
+    `apply_batch` and resolves every caller's future only after it returns.
+    With a zero window, mutations that queue up while a write is in progress
+    still go out together in the next one.
+    """
+
+    def __init__(self, apply_batch, window: float, max_batch: int):
+        self.apply_batch = apply_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.mutations = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, mutation: tuple) -> Future:
+        future = Future()
+        self._queue.put((mutation, future))
+        return future
+
+    def _collect(self) -> Tuple[list, bool]:
+        """Waits for a batch; returns it and whether close() was requested."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if not batch:
+                continue
+            try:
+                results = self.apply_batch([mutation for mutation, _ in batch])
+            except BaseException as exc:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(exc)
+                else:
+                    # Nothing was applied; retry one at a time so a bad
+                    # mutation fails only its own caller
+                    for item in batch:
+                        self._apply_one(*item)
+                continue
+            self.batches += 1
+            self.mutations += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _apply_one(self, mutation: tuple, future: Future) -> None:
+        try:
+            result = self.apply_batch([mutation])[0]
+        except BaseException as exc:
+            future.set_exception(exc)
+            return
+        self.batches += 1
+        self.mutations += 1
+        future.set_result(result)
+
+    def close(self) -> None:
+        """Commits everything queued so far and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def open_store(config: dict, data_file: str = "data.json") -> Storage:
+    """Creates the storage backend selected by config or environment, sharded if configured."""
+    from sharding import open_layout
+
+    settings = config.get("storage", {})
+    backend = os.environ.get("STORAGE_BACKEND", settings.get("backend", "json"))
+    path = os.environ.get("STORAGE_PATH", settings.get("path"))
+    shards = int(os.environ.get("STORAGE_SHARDS", settings.get("shards", 1)))
+    storage = open_layout(backend, path or (data_file if backend == "json" else "data.db"), shards)
+
+    window_ms = os.environ.get("GROUP_COMMIT_MS", settings.get("group_commit_ms", DEFAULT_GROUP_COMMIT_MS))
+    if window_ms is not None and window_ms != "off":
+        storage.enable_group_commit(
+            float(window_ms),
+            int(settings.get("group_commit_max", DEFAULT_GROUP_COMMIT_MAX))
+        )
+    return storage
+
+
+class AsyncStore:
+    """Async facade over a Storage backend; calls run in a bounded thread pool."""
+
+    def __init__(self, storage: Storage, max_workers: int = DEFAULT_IO_WORKERS):
+        self.storage = storage
+        # Operational counters, e.g. "writes_avoided" for unsaved virtual users
+        self.stats: Counter = Counter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+        self._in_flight = metrics.STORAGE_IN_FLIGHT.labels()
+        self._writes_avoided = metrics.WRITES_AVOIDED.labels()
+
+    def count_writes_avoided(self, count: int = 1) -> None:
+        """Counts reads of unknown users that were answered without saving them."""
+        self.stats["writes_avoided"] += count
+        self._writes_avoided.inc(count)
+
+    async def run(self, fn, *args):
+        """Runs a blocking callable in the storage thread pool."""
+        loop = asyncio.get_running_loop()
+        with self._in_flight.track_inprogress():
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def get_user(self, email: str) -> Optional[UserRecord]:
+        return await self.run(self.storage.get_user, email)
+
+    async def _mutate(self, mutation: tuple) -> Tuple[UserRecord, bool]:
+        if self.storage.queues_mutations:
+            # Wait on the batch future directly instead of parking a pool thread
+            return await asyncio.wrap_future(self.storage.submit(mutation))
+        return await self.run(lambda: self.storage.apply_mutations([mutation])[0])
+
+    async def create_user(self, email: str) -> UserRecord:
+        return (await self._mutate(("create", email, None)))[0]
+
+    async def apply_mutations(self, mutations: List[tuple]) -> List[Tuple[UserRecord, bool]]:
+        """Applies a batch of mutations in one storage transaction (one durable write)."""
+        return await self.run(self.storage.apply_mutations, mutations)
+
+    async def get_users(self, emails: List[str]) -> dict:
+        return await self.run(self.storage.get_users, emails)
+
+    async def complete_task(self, email: str, task_id: int) -> Tuple[UserRecord, bool]:
+        return await self._mutate(("complete", email, task_id))
+
+    async def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, UserRecord]]:
+        return await self.run(self.storage.list_users, after, limit)
+
+    async def count_users(self) -> int:
+        return await self.run(self.storage.count_users)
+
+    async def refresh(self) -> None:
+        return await self.run(self.storage.refresh)
+
+    async def cohort_summary(self, checklist: Optional[str] = None) -> dict:
+        return await self.run(self.storage.cohort_summary, checklist)
+
+    async def load(self) -> dict:
+        return await self.run(self.storage.load)
+
+    def shutdown(self) -> None:
+        """Waits for pending storage calls and commits to finish."""
+        self._executor.shutdown(wait=True)
+        self.storage.close()
+
+
+def open_async_store(config: dict, data_file: str = "data.json") -> AsyncStore:
+    """Creates the configured storage backend wrapped in an AsyncStore."""
+    settings = config.get("storage", {})
+    io_workers = int(os.environ.get("STORAGE_IO_WORKERS", settings.get("io_workers", DEFAULT_IO_WORKERS)))
+    return AsyncStore(open_store(config, data_file), max_workers=io_workers)
+
+
+_UNLOADED = object()
+
+
+class JsonStore(Storage):
+    """
+    In-memory view of the snapshot plus journal.
+
+    Mutations append one record to the journal (O(1) bytes regardless of the
+    number of users); every `compact_every` records the full state is written
+    to a new snapshot and the journal is truncated.
+    """
+
+    def __init__(self, filepath: str, compact_every: int = DEFAULT_COMPACT_EVERY, fsync: bool = True):
+        self.filepath = filepath
+        self.journal_path = f"{filepath}.journal"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._data: dict = {}
+        self._snapshot_signature = _UNLOADED
+        self._journal_signature = _UNLOADED
+        self._journal_offset = 0
+        self._journal_records = 0
+        # Files are read on first access; the cohort index is built on first use
+        self._loaded = False
+        self._index_stale = True
+        self.lock_path = f"{filepath}.lock"
+        self._lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self._lock_pid: Optional[int] = None
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Holds the in-process lock and the cross-process file lock."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            # A forked child must not share the parent's lock file description.
+            if self._lock_pid != os.getpid():
+                self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    # Loading
+
+    def _read_journal(self, offset: int, on_change=None) -> None:
+        """Replays journal records starting at byte offset, reporting changes to on_change."""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except OSError:
+            return
+        # A crash mid-append can leave a trailing partial line; it is ignored
+        # here and cut off before the next append.
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            apply_record(self._data, record, on_change)
+            self._journal_records += 1
+        self._journal_offset = offset + end
+
+    def _refresh(self) -> None:
+        """Brings the in-memory view up to date with the files on disk."""
+        snapshot_signature = file_signature(self.filepath)
+        journal_signature = file_signature(self.journal_path)
+        if (snapshot_signature == self._snapshot_signature
+                and journal_signature == self._journal_signature):
+            return
+        with metrics.STORAGE_LOAD.time():
+            self._reload(snapshot_signature, journal_signature)
+
+    def _reload(self, snapshot_signature, journal_signature) -> None:
+        """Reads the journal tail or both files, whichever changed."""
+        journal_grew = (
+            snapshot_signature == self._snapshot_signature
+            and journal_signature is not None
+            and self._journal_signature not in (None, _UNLOADED)
+            and journal_signature[0] == self._journal_signature[0]
+            and journal_signature[2] >= self._journal_offset
+        )
+        if journal_grew:
+            self._read_journal(self._journal_offset, self._on_change)
+        else:
+            self._data = {
+                email: UserRecord.from_dict(user) for email, user in load_snapshot(self.filepath).items()
+            }
+            self._journal_offset = 0
+            self._journal_records = 0
+            # The index is rebuilt by the next cohort_summary; replayed records
+            # are old news to the feed: it gets one reset instead (none for the
+            # first load, which has nothing to take back)
+            self._index_stale = True
+            self._read_journal(0)
+            if self.feed is not None and self._loaded:
+                self.feed.reset()
+            self._loaded = True
+
+        self._snapshot_signature = snapshot_signature
+        self._journal_signature = file_signature(self.journal_path)
+
+    # Readers get copies: mutations update records in place on storage
+    # threads, which would otherwise change under a response being rendered
+
+    def load(self) -> dict:
+        """Returns a copy of all user data, re-reading files only if they changed."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            return {email: user.copy() for email, user in self._data.items()}
+
+    def get_user(self, email: str) -> Optional[UserRecord]:
+        """Returns a user record, or None if the user doesn't exist."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            user = self._data.get(email)
+            return user.copy() if user is not None else None
+
+    def get_users(self, emails: Iterable[str]) -> dict:
+        """Returns {email: record} for those of the emails that exist."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            data = self._data
+            return {email: data[email].copy() for email in emails if email in data}
+
+    def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, UserRecord]]:
+        """Returns (email, record) pairs ordered by email, starting after `after`."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            emails = sorted(email for email in self._data if after is None or email > after)
+            if limit is not None:
+                emails = emails[:limit]
+            return [(email, self._data[email].copy()) for email in emails]
+
+    def count_users(self) -> int:
+        """Returns the number of users."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            return len(self._data)
+
+    @property
+    def _on_change(self):
+        return self._notify_change if self.index is not None or self.feed is not None else None
+
+    def _notify_change(self, email: str, before: Optional[UserRecord], after: UserRecord) -> None:
+        if self.index is not None and not self._index_stale:
+            self.index.on_change(email, before, after)
+        if self.feed is not None:
+            self.feed.on_change(email, before, after)
+
+    def attach_index(self, index) -> None:
+        # Built from the users on first use, not here: opening a store (and
+        # starting a server) doesn't read the files or pass over every user
+        with self._lock:
+            self.index = index
+            self._index_stale = True
+
+    def cohort_summary(self, checklist: Optional[str] = None) -> dict:
+        with self._locked(exclusive=False):
+            self._refresh()
+            if self._index_stale:
+                self.index.rebuild(self._data.items())
+                self._index_stale = False
+            return self.index.summary(checklist)
+
+    def refresh(self) -> None:
+        with self._locked(exclusive=False):
+            self._refresh()
+
+    def iter_users(self, after: Optional[str] = None, batch_size: int = 1000) -> Iterator[Tuple[str, UserRecord]]:
+        # Sort the email index once under the lock, then read records without
+        # holding it; a report may see mutations made while it streams.
+        with self._locked(exclusive=False):
+            self._refresh()
+            data = self._data
+            emails = sorted(email for email in data if after is None or email > after)
+        for email in emails:
+            yield email, data[email].copy()
+
+    # Mutations
+
+    def _append(self, records: List[dict]) -> None:
+        """Durably appends records to the journal with one write and fsync."""
+        if not records:
+            return
+        with metrics.SERIALIZE.time():
+            lines = b"".join(json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n" for record in records)
+        with metrics.STORAGE_SAVE.time():
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                if os.fstat(fd).st_size > self._journal_offset:
+                    # Drop a partial record left behind by a crashed writer.
+                    os.ftruncate(fd, self._journal_offset)
+                os.write(fd, lines)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        metrics.STORAGE_WRITE_BYTES.labels("journal").observe(len(lines))
+        self._journal_offset += len(lines)
+        self._journal_records += len(records)
+        self._journal_signature = file_signature(self.journal_path)
+        if self._journal_records >= self.compact_every:
+            self._compact()
+
+    def apply_mutations(self, mutations: List[tuple]) -> List[Tuple[UserRecord, bool]]:
+        for mutation in mutations:
+            check_mutation(mutation)
+        with self._locked(exclusive=True):
+            self._refresh()
+            now = datetime.now().isoformat()
+            records, results = [], []
+            try:
+                for op, email, task_id in mutations:
+                    user = self._data.get(email)
+                    if op == "create":
+                        unchanged = user is not None
+                        record = {"op": "create", "email": email, "at": now}
+                    else:
+                        unchanged = user is not None and user.has(task_id)
+                        record = {"op": "complete", "email": email, "task_id": task_id, "at": now}
+                    if not unchanged:
+                        apply_record(self._data, record, self._on_change)
+                        records.append(record)
+                    user = self._data[email]
+                    results.append((user.copy(), unchanged))
+                self._append(records)
+            except BaseException:
+                # Memory may hold records that never reached disk; reload.
+                self._snapshot_signature = _UNLOADED
+                self._journal_signature = _UNLOADED
+                raise
+            return results
+
+    # Compaction
+
+    def _compact(self) -> None:
+        """Writes a fresh snapshot and truncates the journal."""
+        with metrics.SERIALIZE.time():
+            snapshot = {email: user.to_dict() for email, user in self._data.items()}
+        with metrics.STORAGE_SAVE.time():
+            save_json_file(self.filepath, snapshot)
+            with open(self.journal_path, 'wb') as f:
+                if self.fsync:
+                    os.fsync(f.fileno())
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._snapshot_signature = file_signature(self.filepath)
+        self._journal_signature = file_signature(self.journal_path)
+        if self._snapshot_signature is not None:
+            metrics.STORAGE_WRITE_BYTES.labels("snapshot").observe(self._snapshot_signature[2])
+
+    def compact(self) -> None:
+        """Folds the journal into the snapshot."""
+        with self._locked(exclusive=True):
+            self._refresh()
+            self._compact()
+
+    def save(self, data: dict) -> None:
+        """Replaces all user data with a new snapshot of UserRecords (or record dicts)."""
+        with self._locked(exclusive=True):
+            self._data = {
+                email: user if isinstance(user, UserRecord) else UserRecord.from_dict(user)
+                for email, user in data.items()
+            }
+            self._index_stale = True
+            if self.feed is not None:
+                self.feed.reset()
+            self._loaded = True
+            self._compact()
+
+    def invalidate(self) -> None:
+        """Forces the next read to reload both files."""
+        with self._lock:
+            self._snapshot_signature = _UNLOADED
+            self._journal_signature = _UNLOADED
+
+
+class KeyedLocks:
+    """
+    Per-key asyncio locks (one per user email).
+    Requests for the same user are serialized while different users proceed
+    concurrently; a lock is dropped once nobody holds or waits on it.
+    """
+
+    def __init__(self):
+        self._locks: dict = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
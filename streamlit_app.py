@@ -1,10 +1,19 @@
+import os
+
 import streamlit as st
 import requests
-import json
 
-# Watson Orchestrate Configuration
-ORCHESTRATE_API_KEY = "9BoWYXsiNAwF1V7ljv8nN5c8lxg7Dq4SFBy-8Axvc2jX"
-ORCHESTRATE_URL = "https://api.us-south.watson-orchestrate.cloud.ibm.com/instances/21192705-1d5a-4bfe-b8f5-11699516e970"
+from orchestrate_client import OrchestrateClient, OrchestrateError
+
+# Watson Orchestrate Configuration (ORCHESTRATE_URL can point to
+# benchmarks/mock_orchestrate.py for offline testing)
+ORCHESTRATE_API_KEY = os.environ.get("ORCHESTRATE_API_KEY", "9BoWYXsiNAwF1V7ljv8nN5c8lxg7Dq4SFBy-8Axvc2jX")
+ORCHESTRATE_URL = os.environ.get(
+    "ORCHESTRATE_URL",
+    "https://api.us-south.watson-orchestrate.cloud.ibm.com/instances/21192705-1d5a-4bfe-b8f5-11699516e970"
+)
+# Ask for streamed (server-sent events) answers; off by default
+ORCHESTRATE_STREAM = os.environ.get("ORCHESTRATE_STREAM", "false").lower() in ("1", "true", "yes")
 
 st.set_page_config(page_title="HR Agent", page_icon="🤖", layout="centered")
 
@@ -21,35 +30,29 @@ for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
-# Function to send request to Watson Orchestrate
-def send_to_orchestrate(user_message):
-    headers = {
-        "Authorization": f"Bearer {ORCHESTRATE_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "input": {
-            "text": user_message
-        }
-    }
-    
+# One pooled client per app process: reruns and chat sessions reuse its connections
+@st.cache_resource
+def get_orchestrate_client():
+    return OrchestrateClient(ORCHESTRATE_URL, ORCHESTRATE_API_KEY, stream=ORCHESTRATE_STREAM)
+
+# Function to send request to Watson Orchestrate, rendering the answer as it streams in (if streaming)
+def send_to_orchestrate(user_message, placeholder):
+    response = ""
     try:
-        response = requests.post(
-            f"{ORCHESTRATE_URL}/v1/messages",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("output", {}).get("text", "Sorry, no response received")
-        else:
-            return f"API Error: {response.status_code} - {response.text}"
+        chunks = get_orchestrate_client().stream_message(user_message)
+        with st.spinner("Thinking..."):
+            response = next(chunks, "")
+        placeholder.markdown(response + "▌")
+        for chunk in chunks:
+            response += chunk
+            placeholder.markdown(response + "▌")
+        return response or "Sorry, no response received"
     
-    except Exception as e:
-        return f"Connection Error: {str(e)}"
+    except OrchestrateError as e:
+        return f"API Error: {e}"
+    except (requests.RequestException, ValueError) as e:
+        # Keep what already arrived if the stream broke off
+        return f"{response}\n\nConnection Error: {str(e)}" if response else f"Connection Error: {str(e)}"
 
 # Message input field
 if prompt := st.chat_input("Write your question..."):
@@ -62,9 +65,9 @@ if prompt := st.chat_input("Write your question..."):
     
     # Get response from Watson Orchestrate
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response = send_to_orchestrate(prompt)
-            st.markdown(response)
+        placeholder = st.empty()
+        response = send_to_orchestrate(prompt, placeholder)
+        placeholder.markdown(response)
     
     # Add assistant response to history
     st.session_state.messages.append({"role": "assistant", "content": response})
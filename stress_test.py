@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent task completions.
+
+Starts several processes that share one data file (like uvicorn workers or the
+MCP and HTTP servers in docker-compose). Each process fires every
+(email, task_id) completion in random order from many threads at once, using
+the same per-user async locks as the servers. Afterwards the final state is
+checked: every user must have every task exactly once, and exactly one caller
+per (email, task_id) must have seen it as newly completed.
+
+Usage:
+    python stress_test.py [--processes 4] [--users 200] [--threads 16] [--backend json|sqlite]
+                           [--group-commit-ms 0] [--shards 1]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sharding import ShardedStore, shard_paths
+from store import JsonStore, KeyedLocks
+
+TASK_IDS = range(1, 10)
+
+
+def open_backend(backend: str, data_file: str, compact_every: int = 1000, group_commit_ms=None, shards: int = 1):
+    """Opens the storage backend under test."""
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        stores = [SqliteStore(path) for path in shard_paths(data_file, shards)]
+    else:
+        stores = [JsonStore(path, compact_every=compact_every, fsync=False) for path in shard_paths(data_file, shards)]
+    storage = stores[0] if shards == 1 else ShardedStore(stores)
+    if group_commit_ms is not None:
+        storage.enable_group_commit(group_commit_ms)
+    return storage
+
+
+def worker(backend: str, data_file: str, emails: list, threads: int, compact_every: int,
+           group_commit_ms, shards: int, seed: int, results) -> None:
+    """Completes every (email, task_id) pair once and reports new completions."""
+    store = open_backend(backend, data_file, compact_every, group_commit_ms, shards)
+    locks = KeyedLocks()
+    pairs = [(email, task_id) for email in emails for task_id in TASK_IDS]
+    random.Random(seed).shuffle(pairs)
+
+    async def complete(executor, email, task_id):
+        async with locks.hold(email):
+            loop = asyncio.get_running_loop()
+            _, was_completed = await loop.run_in_executor(executor, store.complete_task, email, task_id)
+        return (email, task_id) if not was_completed else None
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            done = await asyncio.gather(*(complete(executor, e, t) for e, t in pairs))
+        return [pair for pair in done if pair]
+
+    results.put(asyncio.run(run()))
+    store.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--compact-every", type=int, default=250,
+                        help="small value so compactions race with appends")
+    parser.add_argument("--group-commit-ms", type=float, default=0.0,
+                        help="group commit window; negative disables group commit")
+    parser.add_argument("--shards", type=int, default=1, help="spread users over this many stores")
+    args = parser.parse_args()
+    group_commit_ms = args.group_commit_ms if args.group_commit_ms >= 0 else None
+
+    emails = [f"user{i}@company.com" for i in range(args.users)]
+    expected = {(email, task_id) for email in emails for task_id in TASK_IDS}
+    total_calls = len(expected) * args.processes
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_file = os.path.join(tmpdir, "data.db" if args.backend == "sqlite" else "data.json")
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(
+                target=worker,
+                args=(args.backend, data_file, emails, args.threads, args.compact_every,
+                      group_commit_ms, args.shards, seed, results)
+            )
+            for seed in range(args.processes)
+        ]
+
+        started = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        newly_completed = []
+        for _ in procs:
+            newly_completed.extend(results.get())
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+
+        errors = []
+        if any(proc.exitcode != 0 for proc in procs):
+            errors.append("a worker process crashed")
+        if len(newly_completed) != len(expected) or set(newly_completed) != expected:
+            errors.append(
+                f"expected {len(expected)} new completions, got {len(newly_completed)} "
+                f"({len(set(newly_completed))} distinct)"
+            )
+
+        data = open_backend(args.backend, data_file, shards=args.shards).load()
+        if set(data) != set(emails):
+            errors.append(f"expected {len(emails)} users, found {len(data)}")
+        for email, user in data.items():
+            if user.completed_tasks != list(TASK_IDS):
+                errors.append(f"{email}: completed_tasks = {user.completed_tasks}")
+
+    print(f"{total_calls} completions from {args.processes} processes in {elapsed:.2f}s "
+          f"({total_calls / elapsed:.0f}/s)")
+    if errors:
+        for error in errors[:20]:
+            print(f"FAIL: {error}")
+        return 1
+    print("OK: no lost or duplicated updates")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())